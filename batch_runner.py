@@ -0,0 +1,174 @@
+"""批量对局模拟：用进程池无界面地跑大量AI对局，统计胜率、对局时长和各武器伤害
+
+示例:
+    python batch_runner.py --matches 1000 --seed 1 --output summary.json
+    python batch_runner.py --matches 500 --set AI_FIRE_CHANCE=0.03 --set BULLET_TYPES.big.damage=50
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import time
+
+import game
+
+# 每个工作进程复用同一个Game对象
+_worker_game = None
+_worker_max_ticks = None
+
+
+def parse_override(text):
+    """解析 NAME=VALUE 或 BULLET_TYPES.big.damage=VALUE 形式的参数覆盖"""
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"参数覆盖格式应为 NAME=VALUE: {text}")
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return name.strip(), value
+
+
+def apply_overrides(overrides):
+    """把参数覆盖写入game模块的常量（点号路径用于字典内的键）"""
+    for name, value in overrides:
+        path = name.split(".")
+        if not hasattr(game, path[0]):
+            raise ValueError(f"未知参数: {path[0]}")
+        if len(path) == 1:
+            setattr(game, path[0], value)
+            continue
+        target = getattr(game, path[0])
+        for key in path[1:-1]:
+            target = target[key]
+        if path[-1] not in target:
+            raise ValueError(f"未知参数: {name}")
+        target[path[-1]] = value
+
+
+def init_worker(overrides, max_ticks):
+    global _worker_game, _worker_max_ticks
+    apply_overrides(overrides)
+    _worker_game = game.Game(headless=True, bot_players=True)
+    _worker_max_ticks = max_ticks
+
+
+def run_match(task):
+    """在工作进程中跑一局，返回可序列化的结果"""
+    game_mode, seed = task
+    sim = _worker_game
+    winner = sim.run_headless(game_mode, _worker_max_ticks, seed)
+    # 达到--max-ticks仍未分出结果的对局单独统计，不算作平局
+    finished = sim.game_state == "game_over"
+    return {
+        "mode": game_mode,
+        "seed": seed,
+        "winner": game.describe_winner(winner) if finished else "未结束",
+        "ticks": sim.tick_count,
+        "timeout": sim.time_remaining <= 0,
+        "damage": dict(sim.damage_by_weapon),
+        "shots": dict(sim.bullets.shots_fired),
+        "map": sim.walls.connectivity,
+    }
+
+
+def summarize(results):
+    """按游戏模式汇总胜率、对局时长和各武器伤害"""
+    summary = {}
+    for game_mode in game.GAME_MODES:
+        mode_results = [result for result in results if result["mode"] == game_mode]
+        if not mode_results:
+            continue
+
+        count = len(mode_results)
+        wins = {}
+        for result in mode_results:
+            wins[result["winner"]] = wins.get(result["winner"], 0) + 1
+
+        ticks = [result["ticks"] for result in mode_results]
+        weapons = {}
+        for kind in game.BULLET_KINDS:
+            damage = sum(result["damage"][kind] for result in mode_results)
+            shots = sum(result["shots"][kind] for result in mode_results)
+            weapons[kind] = {
+                "total_damage": damage,
+                "damage_per_match": damage / count,
+                "shots": shots,
+                "damage_per_shot": damage / shots if shots else 0.0,
+            }
+
+        summary[game_mode] = {
+            "matches": count,
+            "win_rates": {name: wins[name] / count for name in sorted(wins)},
+            "timeout_rate": sum(result["timeout"] for result in mode_results) / count,
+            "ticks": {
+                "mean": statistics.fmean(ticks),
+                "median": statistics.median(ticks),
+                "min": min(ticks),
+                "max": max(ticks),
+            },
+            "weapons": weapons,
+            # 地图生成时发现并打通的封闭区域
+            "map_connectivity": {
+                "repaired_rate": sum(result["map"]["converted_walls"] > 0 for result in mode_results) / count,
+                "mean_sealed_cells": statistics.fmean(result["map"]["sealed_cells"] for result in mode_results),
+                "mean_converted_walls": statistics.fmean(result["map"]["converted_walls"] for result in mode_results),
+            },
+        }
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="坦克大战 - 批量AI对局模拟")
+    parser.add_argument("--matches", type=int, default=100, help="每个游戏模式的对局数")
+    parser.add_argument("--modes", nargs="+", choices=list(game.GAME_MODES), default=list(game.GAME_MODES),
+                        help="参与模拟的游戏模式")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="工作进程数")
+    parser.add_argument("--seed", type=int, default=0, help="基础种子，每局使用不同的种子")
+    parser.add_argument("--max-ticks", type=int, default=None, help="每局最多模拟的tick数")
+    parser.add_argument("--set", dest="overrides", action="append", type=parse_override, default=[],
+                        metavar="NAME=VALUE", help="覆盖game模块中的参数，可重复使用")
+    parser.add_argument("--output", default="batch_summary.json", help="汇总结果输出文件")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    apply_overrides(args.overrides)  # 提前校验参数名
+
+    # 所有对局的种子互不相同：seed + 全局对局序号
+    tasks = []
+    for mode_index, game_mode in enumerate(args.modes):
+        for i in range(args.matches):
+            tasks.append((game_mode, args.seed + mode_index * args.matches + i))
+
+    start = time.perf_counter()
+    chunksize = max(1, len(tasks) // (args.workers * 8))
+    with multiprocessing.Pool(args.workers, initializer=init_worker,
+                              initargs=(args.overrides, args.max_ticks)) as pool:
+        results = list(pool.imap_unordered(run_match, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "matches": len(results),
+        "workers": args.workers,
+        "seed": args.seed,
+        "max_ticks": args.max_ticks,
+        "overrides": dict(args.overrides),
+        "elapsed_seconds": elapsed,
+        "matches_per_second": len(results) / elapsed if elapsed else 0.0,
+        "modes": summarize(results),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"完成 {len(results)} 局，用时 {elapsed:.1f} 秒（{report['matches_per_second']:.1f} 局/秒）")
+    for game_mode, mode_summary in report["modes"].items():
+        rates = ", ".join(f"{name} {rate:.1%}" for name, rate in mode_summary["win_rates"].items())
+        print(f"{game_mode}: {rates}，平均 {mode_summary['ticks']['mean']:.0f} tick")
+    print(f"汇总已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""性能基准：用固定种子的场景分别测量模拟核心（tick/秒）和draw_game（帧/秒，离屏绘制），
+结果写成JSON并与保存的基线比较，低于基线超过容差时以非0状态退出
+
+示例:
+    python benchmark.py                                   # 与 benchmark_baseline.json 比较
+    python benchmark.py --scenarios bullets lightning --output bench.json
+    python benchmark.py --update-baseline                 # 用本次结果覆盖基线
+"""
+import os
+
+# 绘制测试使用离屏的dummy显示驱动，须在初始化pygame显示之前设置
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import game
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+# 场景中所有坦克的生命值，保证测量期间对局不会结束
+BENCH_HEALTH = 10 ** 9
+BULLET_TARGET = 200  # bullets场景中维持的子弹数
+LIGHTNING_PER_TICK = 2  # lightning场景中每tick射向敌群的闪电弹数
+AI_TANKS = 20  # ai场景中的AI坦克数
+DENSE_WALL_SCALE = 2  # dense_map场景的墙壁数量上限倍数
+
+
+def border_walls(width, height):
+    """只有边界墙的空地图"""
+    walls = game.WallGrid(width=width, height=height)
+    for x in range(0, width, game.GRID_SIZE):
+        walls.append(game.Wall(x, 0))
+        walls.append(game.Wall(x, height - game.GRID_SIZE))
+    for y in range(game.GRID_SIZE, height - game.GRID_SIZE, game.GRID_SIZE):
+        walls.append(game.Wall(0, y))
+        walls.append(game.Wall(width - game.GRID_SIZE, y))
+    return walls
+
+
+def replace_walls(sim, walls):
+    sim.walls = walls
+    sim.navigator = game.Navigator(walls)
+    sim.chunk_surfaces = {}
+
+
+def setup_empty(sim, rng):
+    replace_walls(sim, border_walls(sim.walls.width, sim.walls.height))
+
+
+def setup_dense_map(sim, rng):
+    """墙壁数量上限放大DENSE_WALL_SCALE倍重新生成地图，坦克位置不变"""
+    saved = game.MAX_FIXED_WALLS, game.MAX_BREAKABLE_WALLS
+    game.MAX_FIXED_WALLS *= DENSE_WALL_SCALE
+    game.MAX_BREAKABLE_WALLS *= DENSE_WALL_SCALE
+    try:
+        walls = game.create_random_map(rng, sim.walls.width, sim.walls.height)
+    finally:
+        game.MAX_FIXED_WALLS, game.MAX_BREAKABLE_WALLS = saved
+    # 清掉压在坦克上的墙
+    for tank in sim.tanks:
+        wall = walls.get(*game.cell_at(tank.x, tank.y))
+        if wall is not None:
+            walls.remove(wall)
+    replace_walls(sim, walls)
+
+
+def setup_effects(sim, rng):
+    """所有坦克同时加速和无敌，持续产生特效粒子"""
+    for tank in sim.tanks:
+        tank.add_status_effect("speed", game.GAME_TIME_LIMIT)
+        tank.add_status_effect("invincible", game.GAME_TIME_LIMIT)
+
+
+def setup_ai(sim, rng):
+    """保留AI_TANKS辆敌人（坦克序号即列表下标，所以只截掉末尾）"""
+    sim.tanks = sim.tanks[:len(sim.players) + AI_TANKS]
+    sim.enemies = sim.enemies[:AI_TANKS]
+
+
+def feed_bullets(sim, rng):
+    """从随机坦克向随机方向补充子弹，维持BULLET_TARGET颗"""
+    for _ in range(BULLET_TARGET - sim.bullets.count):
+        tank = rng.choice(sim.tanks)
+        bullet_type = rng.choice(game.BULLET_KINDS)
+        angle = rng.uniform(0, 360)
+        offset = game.BULLET_TYPES[bullet_type]["muzzle_offset"]
+        angle_rad = math.radians(angle)
+        sim.bullets.spawn(tank.x + tank.width / 2 + math.sin(angle_rad) * offset,
+                          tank.y + tank.height / 2 - math.cos(angle_rad) * offset,
+                          angle, bullet_type, tank.tank_id, tank.is_enemy)
+
+
+def feed_lightning(sim, rng):
+    """在敌人正下方放置向上飞的闪电弹，下一tick命中并波及相邻敌人"""
+    shooter = sim.players[0]
+    for _ in range(LIGHTNING_PER_TICK):
+        target = rng.choice(sim.enemies)
+        sim.bullets.spawn(target.x + target.width / 2, target.y + target.height + 6,
+                          0, "lightning", shooter.tank_id, shooter.is_enemy)
+
+
+# 场景名 -> (游戏模式, 开局后的布置, 每tick模拟前的补充)
+SCENARIOS = {
+    "empty_arena": ("人机对战", setup_empty, None),
+    "dense_map": ("双人+电脑", setup_dense_map, None),
+    "bullets": ("双人+电脑", None, feed_bullets),
+    "lightning": ("坦克围攻", setup_empty, feed_lightning),
+    "effects": ("坦克围攻", setup_effects, None),
+    "ai": ("坦克围攻", setup_ai, None),
+}
+
+
+def prepare(sim, name, seed):
+    """按场景开局，返回场景自己的随机数生成器和每tick的补充函数"""
+    game_mode, setup, feed = SCENARIOS[name]
+    sim.reset_game(game_mode, seed)
+    sim.game_state = "playing"
+    rng = random.Random(seed)
+    if setup is not None:
+        setup(sim, rng)
+    for tank in sim.tanks:
+        tank.health = tank.max_health = BENCH_HEALTH
+    return rng, feed
+
+
+def advance(sim, rng, feed):
+    if feed is not None:
+        feed(sim, rng)
+    sim.step()
+
+
+def run_ticks(sim, name, seed, warmup, ticks):
+    """只计时Game.step，返回每tick耗时（秒）和结束时的实体数量"""
+    rng, feed = prepare(sim, name, seed)
+    for _ in range(warmup):
+        advance(sim, rng, feed)
+    samples = []
+    for _ in range(ticks):
+        if feed is not None:
+            feed(sim, rng)
+        start = time.perf_counter()
+        sim.step()
+        samples.append(time.perf_counter() - start)
+    return samples, sim.entity_counts()
+
+
+def run_frames(sim, name, seed, warmup, frames):
+    """每帧先推进一个tick（不计时），再计时一次draw_game"""
+    rng, feed = prepare(sim, name, seed)
+    for _ in range(warmup):
+        advance(sim, rng, feed)
+        sim.draw_game(0.5)
+    samples = []
+    for _ in range(frames):
+        advance(sim, rng, feed)
+        start = time.perf_counter()
+        sim.draw_game(0.5)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def rate(samples):
+    """每秒次数及单次耗时的p50/p95（毫秒）。每秒次数按中位耗时计算，不受偶发的系统抖动影响"""
+    p50, p95 = np.percentile(np.asarray(samples), (50, 95))
+    return 1 / p50, p50 * 1000, p95 * 1000
+
+
+def run_scenario(name, args, headless_sim, render_sim):
+    """重复args.repeat次，取每秒次数最高的一次（与timeit相同，最快的一次最少受其他进程干扰）"""
+    tick_rates = []
+    frame_rates = []
+    for _ in range(args.repeat):
+        tick_samples, entities = run_ticks(headless_sim, name, args.seed, args.warmup, args.ticks)
+        tick_rates.append(rate(tick_samples))
+        frame_rates.append(rate(run_frames(render_sim, name, args.seed, args.warmup, args.frames)))
+    ticks_per_second, tick_p50, tick_p95 = max(tick_rates)
+    frames_per_second, frame_p50, frame_p95 = max(frame_rates)
+    return {
+        "ticks_per_second": ticks_per_second,
+        "tick_ms_p50": tick_p50,
+        "tick_ms_p95": tick_p95,
+        "frames_per_second": frames_per_second,
+        "frame_ms_p50": frame_p50,
+        "frame_ms_p95": frame_p95,
+        "entities": entities,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """逐场景比较每秒次数，返回[(场景, 指标, 基线, 本次, 比值, 是否退化)]"""
+    rows = []
+    for name, result in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        for metric in ("ticks_per_second", "frames_per_second"):
+            ratio = result[metric] / base[metric]
+            rows.append((name, metric, base[metric], result[metric], ratio, ratio < 1 - tolerance))
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="坦克大战 - 模拟与绘制性能基准")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="要运行的场景")
+    parser.add_argument("--seed", type=int, default=0, help="场景种子，相同种子的场景完全一致")
+    parser.add_argument("--ticks", type=int, default=600, help="每个场景计时的模拟tick数")
+    parser.add_argument("--frames", type=int, default=300, help="每个场景计时的绘制帧数")
+    parser.add_argument("--warmup", type=int, default=60, help="计时前预热的tick/帧数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快的一次")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线结果文件")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="允许低于基线的比例，超过则视为退化")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果写入基线文件")
+    parser.add_argument("--output", default=None, help="本次结果的输出文件（JSON）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    headless_sim = game.Game(headless=True)
+    render_sim = game.Game()
+
+    results = {
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+        },
+        "config": {key: getattr(args, key) for key in ("seed", "ticks", "frames", "warmup", "repeat")},
+        "scenarios": {},
+    }
+    for name in args.scenarios:
+        result = run_scenario(name, args, headless_sim, render_sim)
+        results["scenarios"][name] = result
+        print(f"{name:<12} {result['ticks_per_second']:9.0f} tick/秒 (p95 {result['tick_ms_p95']:.2f}ms)  "
+              f"{result['frames_per_second']:8.0f} 帧/秒 (p95 {result['frame_ms_p95']:.2f}ms)")
+    pygame.quit()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"没有基线文件 {args.baseline}，用 --update-baseline 生成")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["config"] != results["config"]:
+        print(f"警告: 基线的配置 {baseline['config']} 与本次不同，比较结果仅供参考")
+    if baseline["machine"] != results["machine"]:
+        print("警告: 基线来自不同的机器或依赖版本，比较结果仅供参考")
+
+    rows = compare(results, baseline, args.tolerance)
+    for name, metric, base, current, ratio, regressed in rows:
+        mark = "  <-- 退化" if regressed else ""
+        print(f"{name:<12} {metric:<18} 基线 {base:9.0f}  本次 {current:9.0f}  {ratio:6.1%}{mark}")
+    regressions = sum(regressed for *_, regressed in rows)
+    if regressions:
+        print(f"{regressions} 项指标低于基线超过 {args.tolerance:.0%}")
+        return 1
+    print("没有发现性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
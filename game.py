@@ -1,27 +1,72 @@
+import os
+
+# 导入时不打印pygame欢迎信息；各子系统在首次使用时才初始化，导入本模块没有其他副作用
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
 import pygame
+import numpy as np
+import argparse
+import itertools
+import json
 import math
 import random
-import os
-
-# 初始化
-pygame.init()
+import struct
+import time
+import zlib
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager, nullcontext
 
 # 游戏常量
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-FPS = 60
+FPS = 60  # 同时也是固定的模拟tick频率，速度/计时器都按tick计
+SIM_DT = 1.0 / FPS  # 固定模拟步长（秒）
+MAX_RENDER_FPS = 240  # 渲染帧率上限，0表示不限制
+MAX_STEPS_PER_FRAME = 5  # 每个渲染帧最多追赶的模拟步数，超出则丢弃积压时间
+MAX_FRAME_TIME = 0.25  # 单帧计入的最长真实时间（秒），避免卡顿后瞬移
+IDLE_WAIT_MS = 500  # 菜单、暂停和结束画面阻塞等待事件的超时（毫秒）
+PROFILE_WINDOW = 600  # 性能统计的滚动窗口（帧数）
+PROFILE_EXPORT_INTERVAL = 5.0  # 性能统计文件的导出间隔（秒）
+PROFILE_OVERLAY_REFRESH = 30  # 性能浮层每隔多少帧刷新一次
+DIRTY_AREA_LIMIT = 0.5  # 脏矩形合并后超过屏幕面积的该比例时改为整屏更新
+BARREL_ANGLE_STEP = 5  # 预渲染炮管的角度间隔（度）
+LIGHTNING_SPARK_FRAMES = 8  # 预渲染的闪电火花帧数
+# 游戏元素的绘制图层，从下往上
+RENDER_LAYERS = ("powerups", "particles", "tanks", "bullets", "effects")
+# pygame-ce的Surface.fblits不返回绘制范围，比blits更快
+HAS_FBLITS = hasattr(pygame.Surface, "fblits")
+
+# AI参数（距离单位为像素，时间单位为tick）
+AI_ENGAGE_DISTANCE = 200  # 进入该距离后转为攻击
+AI_FIRE_DISTANCE = 250  # 攻击状态下的射击距离
+AI_FIRE_CHANCE = 0.02  # 攻击状态下每tick的射击概率
+AI_IDLE_FIRE_CHANCE = 0.005  # 寻找目标时每tick的射击概率
+AI_RETREAT_DISTANCE = 100  # 小于该距离时后退
+AI_RETREAT_TIME = 30
+AI_MOVE_TIME = 20
+AI_STUCK_TIME = 60  # 移动受阻后随机换向的持续时间
+AI_PATH_TURN_SPEED = 6  # 沿流场寻路时每tick的最大转向角度
+AI_PATH_MAX_ANGLE = 45  # 朝向与路径方向的夹角小于该值时才前进
+AI_THINK_BUDGET = 8  # 每tick最多做决策的AI坦克数，其余沿用上次决策
 GRID_SIZE = 40
 TANK_SIZE = 36
+TANK_BUCKET_SIZE = GRID_SIZE * 2  # AI移动碰撞粗筛的分桶边长，须大于坦克尺寸加单tick位移
+CHUNK_CELLS = 16  # 墙壁分块存储与背景预渲染的块边长（格子数）
 MIN_WALL_SPACING = 1
 MAX_FIXED_WALLS = 18
 MAX_BREAKABLE_WALLS = 25
+TEXT_CACHE_SIZE = 512  # 文字渲染缓存的最大条目数
+MAX_PARTICLES = 4096  # 粒子池容量
+PARTICLE_ALPHA_LEVELS = 16  # 粒子精灵缓存的透明度分级数
+BULLET_POOL_SIZE = 256  # 子弹数组的初始容量，不够时自动翻倍
 GAME_TIME_LIMIT = 5 * 60 * FPS  # 5分钟游戏时限
 
 # 游戏模式配置
 GAME_MODES = {
     "人机对战": {"player_count": 1, "enemy_count": 1},
     "双人对战": {"player_count": 2, "enemy_count": 0},
-    "双人+电脑": {"player_count": 2, "enemy_count": 1}
+    "双人+电脑": {"player_count": 2, "enemy_count": 1},
+    "坦克围攻": {"player_count": 2, "enemy_count": 24, "world_size": (2560, 1920)}
 }
 
 # 颜色定义
@@ -63,13 +108,77 @@ COLORS = {
     'button_click': (120, 120, 200),
 }
 
-# 创建窗口
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("坦克大战 - 多模式对战版")
-clock = pygame.time.Clock()
+# 炮弹类型配置（muzzle_offset为炮口到坦克中心的距离，aoe_radius为0表示无范围伤害）
+BULLET_TYPES = {
+    "normal": {"speed": 7, "radius": 4, "damage": 25, "aoe_radius": 0, "muzzle_offset": 30,
+               "color": COLORS['bullet']},
+    "lightning": {"speed": 10, "radius": 3, "damage": 15, "aoe_radius": 60, "muzzle_offset": 30,
+                  "color": COLORS['lightning_bullet']},
+    "big": {"speed": 4, "radius": 10, "damage": 40, "aoe_radius": 0, "muzzle_offset": 35,
+            "color": COLORS['big_bullet']},
+}
+BULLET_KINDS = list(BULLET_TYPES)
+# 道具图标
+POWERUP_ICONS = {"health": "❤️", "speed": "⚡", "invincible": "🛡️", "bullet_upgrade": "★"}
+
+# 回放记录的按键（按位保存）和射击动作位
+REPLAY_KEYS = (pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d,
+               pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+REPLAY_KEY_BITS = {key: 1 << i for i, key in enumerate(REPLAY_KEYS)}
+ACTION_P1_SHOOT = 1
+ACTION_P1_MOUSE_SHOOT = 2
+ACTION_P2_SHOOT = 4
 
 # 字体缓存
 _font_cache = {}
+# 文字渲染缓存（LRU）：(文字, 字号, 颜色) -> Surface
+_text_cache = OrderedDict()
+# 坦克和子弹的精灵图集，首次创建窗口后生成
+_sprite_atlas = None
+
+
+def world_size(game_mode):
+    """游戏模式的世界大小（像素），未配置时与屏幕一样大"""
+    return GAME_MODES[game_mode].get("world_size", (SCREEN_WIDTH, SCREEN_HEIGHT))
+
+
+@contextmanager
+def interpolated_position(entity, alpha, offset=(0, 0)):
+    """绘制期间把实体坐标临时插值到上一tick与当前tick之间，并减去镜头偏移换算成屏幕坐标"""
+    x, y = entity.x, entity.y
+    entity.x = entity.prev_x + (x - entity.prev_x) * alpha - offset[0]
+    entity.y = entity.prev_y + (y - entity.prev_y) * alpha - offset[1]
+    try:
+        yield entity
+    finally:
+        entity.x, entity.y = x, y
+
+
+def merge_dirty_rects(rects, max_area):
+    """合并相交的脏矩形；合并后总面积超过max_area时返回None，表示整屏更新更划算"""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    if sum(rect.width * rect.height for rect in merged) > max_area:
+        return None
+    return merged
+
+
+@contextmanager
+def screen_position(entity, offset):
+    """绘制期间把实体坐标临时换算成屏幕坐标"""
+    x, y = entity.x, entity.y
+    entity.x = x - offset[0]
+    entity.y = y - offset[1]
+    try:
+        yield entity
+    finally:
+        entity.x, entity.y = x, y
 
 
 def get_chinese_font(size):
@@ -77,6 +186,10 @@ def get_chinese_font(size):
     if size in _font_cache:
         return _font_cache[size]
 
+    # 字体子系统在第一次需要字体时才初始化
+    if not pygame.font.get_init():
+        pygame.font.init()
+
     try:
         font_paths = [
             'C:/Windows/Fonts/simhei.ttf',
@@ -99,6 +212,21 @@ def get_chinese_font(size):
         return font
 
 
+def render_text(text, size, color):
+    """渲染文字并按(文字, 字号, 颜色)缓存，返回的Surface是共享的，不要直接修改"""
+    key = (text, size, color)
+    text_surface = _text_cache.get(key)
+    if text_surface is not None:
+        _text_cache.move_to_end(key)
+        return text_surface
+
+    text_surface = get_chinese_font(size).render(text, True, color)
+    _text_cache[key] = text_surface
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return text_surface
+
+
 class DamageText:
     def __init__(self, x, y, damage, damage_type="normal"):
         self.x = x
@@ -115,6 +243,7 @@ class DamageText:
             "big": COLORS['damage_big']
         }
         self.color = self.color_map.get(damage_type, COLORS['damage_normal'])
+        self.text_surface = None
 
     def update(self):
         self.y += self.velocity_y
@@ -122,16 +251,13 @@ class DamageText:
         self.alpha = max(0, int(255 * (self.lifetime / 60)))
         return self.lifetime > 0
 
-    def draw(self, surface):
-        font = get_chinese_font(18)
-        text = font.render(f"-{self.damage}", True, self.color)
-
-        text_surface = pygame.Surface(text.get_size(), pygame.SRCALPHA)
-        text_surface.fill((0, 0, 0, 0))
-        text_surface.blit(text, (0, 0))
-        text_surface.set_alpha(self.alpha)
+    def sprites(self):
+        # 每个飘字只复制一次缓存的文字，之后每帧仅调整透明度
+        if self.text_surface is None:
+            self.text_surface = render_text(f"-{self.damage}", 18, self.color).copy()
+        self.text_surface.set_alpha(self.alpha)
 
-        surface.blit(text_surface, (int(self.x - text.get_width() // 2), int(self.y)))
+        return [(self.text_surface, (int(self.x - self.text_surface.get_width() // 2), int(self.y)))]
 
 
 class HealText:
@@ -143,6 +269,7 @@ class HealText:
         self.velocity_y = -2
         self.alpha = 255
         self.color = COLORS['heal_effect']
+        self.text_surface = None
 
     def update(self):
         self.y += self.velocity_y
@@ -150,16 +277,13 @@ class HealText:
         self.alpha = max(0, int(255 * (self.lifetime / 60)))
         return self.lifetime > 0
 
-    def draw(self, surface):
-        font = get_chinese_font(18)
-        text = font.render(f"+{self.heal_amount}", True, self.color)
-
-        text_surface = pygame.Surface(text.get_size(), pygame.SRCALPHA)
-        text_surface.fill((0, 0, 0, 0))
-        text_surface.blit(text, (0, 0))
-        text_surface.set_alpha(self.alpha)
+    def sprites(self):
+        # 每个飘字只复制一次缓存的文字，之后每帧仅调整透明度
+        if self.text_surface is None:
+            self.text_surface = render_text(f"+{self.heal_amount}", 18, self.color).copy()
+        self.text_surface.set_alpha(self.alpha)
 
-        surface.blit(text_surface, (int(self.x - text.get_width() // 2), int(self.y)))
+        return [(self.text_surface, (int(self.x - self.text_surface.get_width() // 2), int(self.y)))]
 
 
 class StatusEffect:
@@ -184,17 +308,16 @@ class StatusEffect:
 
     def draw(self, surface, x, y):
         info = self.effect_info.get(self.effect_type, {"color": (255, 255, 255), "name": "未知", "icon": "?"})
-        font = get_chinese_font(16)
 
         bg_rect = pygame.Rect(x, y, self.icon_size + 130, self.icon_size)
         pygame.draw.rect(surface, (40, 40, 60), bg_rect, border_radius=5)
         pygame.draw.rect(surface, info["color"], bg_rect, 2, border_radius=5)
 
-        icon_text = font.render(info["icon"], True, info["color"])
-        surface.blit(icon_text, (x + 5, y + 5))
+        icon_text = render_text(info["icon"], 16, info["color"])
+        drawn = [surface.blit(icon_text, (x + 5, y + 5))]
 
-        name_text = font.render(info["name"], True, (255, 255, 255))
-        surface.blit(name_text, (x + 35, y + 5))
+        name_text = render_text(info["name"], 16, (255, 255, 255))
+        drawn.append(surface.blit(name_text, (x + 35, y + 5)))
 
         progress_width = 60
         progress_fill = (self.duration / self.max_duration) * progress_width
@@ -205,40 +328,274 @@ class StatusEffect:
         pygame.draw.rect(surface, info["color"], fill_rect)
 
         if self.duration < 9990:
-            time_text = font.render(f"{self.duration // 60}秒", True, (200, 200, 200))
-            surface.blit(time_text, (x + 100, y + 15))
+            time_text = render_text(f"{self.duration // 60}秒", 16, (200, 200, 200))
+            drawn.append(surface.blit(time_text, (x + 100, y + 15)))
+        # 文字可能超出背景框，返回全部绘制范围供脏矩形使用
+        return bg_rect.unionall(drawn)
+
+
+class ParticleSystem:
+    """粒子池：位置、速度、大小、寿命、颜色存放在预分配的NumPy数组中，每帧一次向量化更新"""
+
+    def __init__(self, capacity=MAX_PARTICLES, rng=random):
+        self.capacity = capacity
+        self.rng = rng
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.size = np.zeros(capacity)
+        self.lifetime = np.zeros(capacity, dtype=np.int32)
+        self.color_index = np.zeros(capacity, dtype=np.int32)
+
+        # 颜色调色板与预绘制的圆形精灵：(颜色序号, 半径, 透明度等级) -> Surface
+        self.palette = []
+        self.palette_index = {}
+        self.sprite_cache = {}
+
+    def emit(self, x, y, color):
+        """发射一个粒子，池满时直接丢弃"""
+        if self.count >= self.capacity:
+            return
+        if color not in self.palette_index:
+            self.palette_index[color] = len(self.palette)
+            self.palette.append(color)
+
+        i = self.count
+        self.size[i] = self.rng.randint(2, 4)
+        self.lifetime[i] = self.rng.randint(20, 40)
+        self.vel[i] = self.rng.uniform(-1, 1), self.rng.uniform(-1, 1)
+        self.pos[i] = x, y
+        self.color_index[i] = self.palette_index[color]
+        self.count += 1
 
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
 
-class EffectParticle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.size = random.randint(2, 4)
-        self.lifetime = random.randint(20, 40)
-        self.velocity_x = random.uniform(-1, 1)
-        self.velocity_y = random.uniform(-1, 1)
+        self.pos[:n] += self.vel[:n]
+        self.lifetime[:n] -= 1
+        np.maximum(self.size[:n] - 0.1, 0, out=self.size[:n])
+
+        # 压缩存活粒子到数组前部
+        alive = (self.lifetime[:n] > 0) & (self.size[:n] > 0)
+        live = int(np.count_nonzero(alive))
+        if live < n:
+            for array in (self.pos, self.vel, self.size, self.lifetime, self.color_index):
+                array[:live] = array[:n][alive]
+            self.count = live
+
+    def get_sprite(self, color_index, radius, alpha_level):
+        key = (color_index, radius, alpha_level)
+        sprite = self.sprite_cache.get(key)
+        if sprite is None:
+            alpha = alpha_level * 255 // (PARTICLE_ALPHA_LEVELS - 1)
+            sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (*self.palette[color_index], alpha), (radius, radius), radius)
+            self.sprite_cache[key] = sprite
+        return sprite
+
+    def sprites(self, view=None):
+        """粒子的(精灵, 屏幕位置)列表；view为镜头可见区域（世界坐标），只包含其中的粒子"""
+        n = self.count
+        if n == 0:
+            return []
+
+        radii = self.size[:n].astype(np.int32)
+        alpha = np.minimum(255, 255 * self.lifetime[:n] // 40)
+        alpha_levels = alpha * (PARTICLE_ALPHA_LEVELS - 1) // 255
+        xs = (self.pos[:n, 0] - radii).astype(np.int32)
+        ys = (self.pos[:n, 1] - radii).astype(np.int32)
+        color_indices = self.color_index[:n]
+        if view is not None:
+            visible = ((xs + 2 * radii > view.left) & (xs < view.right) &
+                       (ys + 2 * radii > view.top) & (ys < view.bottom))
+            radii = radii[visible]
+            alpha_levels = alpha_levels[visible]
+            xs = xs[visible] - view.left
+            ys = ys[visible] - view.top
+            color_indices = color_indices[visible]
+
+        blit_list = []
+        for color_index, radius, alpha_level, x, y in zip(color_indices.tolist(), radii.tolist(),
+                                                          alpha_levels.tolist(), xs.tolist(), ys.tolist()):
+            if radius > 0:
+                blit_list.append((self.get_sprite(color_index, radius, alpha_level), (x, y)))
+        return blit_list
+
+
+class SpriteAtlas:
+    """预渲染的坦克与子弹精灵：坦克车身按颜色、炮管按BARREL_ANGLE_STEP预先旋转，
+    推进器火焰、血条、武器标记、各类子弹、闪电火花、爆炸和道具也各自预渲染，绘制时只需贴图。
+    须在创建窗口之后生成（用到convert）"""
+
+    BARREL_LENGTH = 25
+    BARREL_WIDTH = 6
+    BARREL_COLOR = (50, 50, 50)
+    INVINCIBLE_FLASH = (255, 255, 200)
+    COLOR_KEY = (255, 0, 255)
+    HEALTH_BAR_HEIGHT = 5
+    HEALTH_COLORS = ((255, 0, 0), (255, 255, 0), (0, 255, 0))
 
-    def update(self):
-        self.x += self.velocity_x
-        self.y += self.velocity_y
-        self.lifetime -= 1
-        self.size = max(0, self.size - 0.1)
-        return self.lifetime > 0 and self.size > 0
+    def __init__(self):
+        # 按需生成的爆炸和道具精灵
+        self.explosions = {}
+        self.powerups = {}
+        # (填充色, 是否有无敌描边) -> 车身
+        self.bodies = {}
+        for color in (COLORS['player'], COLORS['player2'], COLORS['enemy']):
+            self.body(color)
+            self.body(color, outlined=True)
+        self.body(self.INVINCIBLE_FLASH, outlined=True)
+
+        # 炮管：以坦克中心为精灵中心，第i帧朝向 i * BARREL_ANGLE_STEP 度
+        self.barrel_reach = self.BARREL_LENGTH + self.BARREL_WIDTH // 2
+        size = self.barrel_reach * 2 + 1
+        self.barrels = []
+        for i in range(360 // BARREL_ANGLE_STEP):
+            angle_rad = math.radians(i * BARREL_ANGLE_STEP)
+            sprite = self.keyed_surface(size, size)
+            end = (self.barrel_reach + math.sin(angle_rad) * self.BARREL_LENGTH,
+                   self.barrel_reach - math.cos(angle_rad) * self.BARREL_LENGTH)
+            pygame.draw.line(sprite, self.BARREL_COLOR, (self.barrel_reach, self.barrel_reach), end, self.BARREL_WIDTH)
+            self.barrels.append(sprite)
+
+        # 推进器火焰：火焰大小 -> 精灵（与原先三个同心圆的绘制顺序一致）
+        self.thrusters = {}
+        for flame_size in range(8, 13):
+            sprite = self.keyed_surface(flame_size * 2, flame_size * 2)
+            center = (flame_size, flame_size)
+            pygame.draw.circle(sprite, (255, 255, 0), center, flame_size - 4)
+            pygame.draw.circle(sprite, (255, 150, 0), center, flame_size - 2)
+            pygame.draw.circle(sprite, (255, 50, 0), center, flame_size)
+            self.thrusters[flame_size] = sprite
+
+        # 血条：(填充像素, 颜色序号) -> 精灵
+        self.health_bars = {}
+        for color_index, color in enumerate(self.HEALTH_COLORS):
+            for fill in range(TANK_SIZE + 1):
+                sprite = pygame.Surface((TANK_SIZE, self.HEALTH_BAR_HEIGHT))
+                sprite.fill((100, 100, 100))
+                sprite.fill(color, (0, 0, fill, self.HEALTH_BAR_HEIGHT))
+                self.health_bars[fill, color_index] = sprite.convert()
+
+        # 子弹和车身上的武器标记：炮弹类型 -> 精灵
+        self.bullets = {kind: self.circle(info["color"], info["radius"]) for kind, info in BULLET_TYPES.items()}
+        self.weapon_marks = {kind: self.circle(info["color"], 3) for kind, info in BULLET_TYPES.items()}
+
+        # 闪电火花：固定种子生成的几组随机火花，绘制时随机挑一帧
+        spark_rng = random.Random(0)
+        self.sparks = []
+        for _ in range(LIGHTNING_SPARK_FRAMES):
+            sprite = self.keyed_surface(19, 19)
+            for _ in range(5):
+                pygame.draw.circle(sprite, (200, 230, 255),
+                                   (9 + spark_rng.randint(-8, 8), 9 + spark_rng.randint(-8, 8)), 1)
+            self.sparks.append(sprite)
+
+    @staticmethod
+    def keyed_surface(width, height):
+        """用色键表示透明的空白精灵：图形都是纯色不抗锯齿，色键+RLE比逐像素alpha混合快得多"""
+        sprite = pygame.Surface((width, height)).convert()
+        sprite.fill(SpriteAtlas.COLOR_KEY)
+        sprite.set_colorkey(SpriteAtlas.COLOR_KEY, pygame.RLEACCEL)
+        return sprite
+
+    def circle(self, color, radius):
+        sprite = self.keyed_surface(radius * 2, radius * 2)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        return sprite
+
+    def body(self, color, outlined=False):
+        """坦克车身，未预渲染的颜色第一次用到时生成"""
+        sprite = self.bodies.get((color, outlined))
+        if sprite is None:
+            sprite = pygame.Surface((TANK_SIZE, TANK_SIZE))
+            sprite.fill(color)
+            if outlined:
+                pygame.draw.rect(sprite, COLORS['invincible_effect'], sprite.get_rect(), 3)
+            sprite = self.bodies[color, outlined] = sprite.convert()
+        return sprite
+
+    def barrel(self, rotation):
+        return self.barrels[round(rotation / BARREL_ANGLE_STEP) % len(self.barrels)]
+
+    def explosion(self, radius):
+        """爆炸圆环，各半径第一次用到时生成"""
+        sprite = self.explosions.get(radius)
+        if sprite is None:
+            sprite = self.keyed_surface(radius * 2, radius * 2)
+            pygame.draw.circle(sprite, COLORS['explosion'], (radius, radius), radius)
+            pygame.draw.circle(sprite, (255, 255, 100), (radius, radius), radius - 5)
+            self.explosions[radius] = sprite
+        return sprite
+
+    def powerup(self, power_type, color, radius, lit):
+        """道具：闪烁亮起时为圆形加图标，熄灭时只有图标；精灵中心即道具中心"""
+        key = (power_type, color, radius, lit)
+        sprite = self.powerups.get(key)
+        if sprite is None:
+            icon = render_text(POWERUP_ICONS[power_type], 18, (255, 255, 255))
+            width = max(radius * 2, icon.get_width())
+            height = max(radius * 2, icon.get_height())
+            center = (width // 2, height // 2)
+            sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+            if lit:
+                pygame.draw.circle(sprite, color, center, radius)
+                pygame.draw.circle(sprite, (255, 255, 255), center, radius - 5)
+            sprite.blit(icon, icon.get_rect(center=center))
+            sprite = self.powerups[key] = sprite.convert_alpha()
+        return sprite
+
+    def health_bar(self, health, max_health):
+        """血量低于30%为红色，低于60%为黄色"""
+        if health < max_health * 0.3:
+            color_index = 0
+        elif health < max_health * 0.6:
+            color_index = 1
+        else:
+            color_index = 2
+        fill = min(TANK_SIZE, max(0, int(health / max_health * TANK_SIZE)))
+        return self.health_bars[fill, color_index]
+
+
+def get_sprite_atlas():
+    """获取精灵图集，第一次调用时生成"""
+    global _sprite_atlas
+    if _sprite_atlas is None:
+        _sprite_atlas = SpriteAtlas()
+    return _sprite_atlas
 
-    def draw(self, surface):
-        alpha = min(255, int(255 * (self.lifetime / 40)))
-        color_with_alpha = (*self.color, alpha)
 
-        particle_surface = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
-        pygame.draw.circle(particle_surface, color_with_alpha, (self.size, self.size), self.size)
-        surface.blit(particle_surface, (int(self.x - self.size), int(self.y - self.size)))
+class RenderQueue:
+    """按图层收集(精灵, 屏幕位置)，每层用一次Surface.blits提交，省去逐个blit的Python调用开销。
+    图层按RENDER_LAYERS的顺序从下往上绘制，同一图层内保持加入的顺序"""
+
+    def __init__(self):
+        self.layers = {name: [] for name in RENDER_LAYERS}
+
+    def flush(self, surface, dirty=None):
+        """提交并清空所有图层；dirty不为None时追加每次贴图的屏幕范围"""
+        for name in RENDER_LAYERS:
+            items = self.layers[name]
+            if not items:
+                continue
+            if dirty is not None:
+                dirty.extend(surface.blits(items))
+            elif HAS_FBLITS:
+                surface.fblits(items)
+            else:
+                surface.blits(items, doreturn=False)
+            items.clear()
 
 
 class Tank:
-    def __init__(self, x, y, color, is_enemy=False, is_player2=False):
+    def __init__(self, x, y, color, is_enemy=False, is_player2=False, rng=random):
+        self.rng = rng
         self.x = x
         self.y = y
+        self.prev_x = x
+        self.prev_y = y
         self.color = color
         self.width = TANK_SIZE
         self.height = TANK_SIZE
@@ -251,27 +608,40 @@ class Tank:
         self.max_health = 100
         self.is_enemy = is_enemy
         self.is_player2 = is_player2
-        self.bullets = []
+        # 由Game在开局时设置：坦克序号和共享的子弹管理器
+        self.tank_id = 0
+        self.bullet_manager = None
         self.bullet_type = "normal"
         self.invincible = 0
         self.speed_boost = 0
         self.bullet_timer = 0
         self.status_effects = []
         self.thruster_timer = 0
-        self.effect_particles = []
         # 双人模式下都使用键盘控制
         self.mouse_control = not is_enemy and not is_player2
         self.keyboard_control = not is_enemy
+        self.ai_controlled = False
 
         # 敌人特定属性
         if is_enemy:
             self.health = 120
             self.max_health = 120
             self.enemy_damage = 30
-            self.ai_timer = 0
-            self.target_angle = 0
-            self.move_timer = 0
-            self.shoot_cooldown = random.randint(30, 90)
+            self.enable_ai()
+
+    def enable_ai(self):
+        """交给AI控制（敌人默认开启，批量模拟时玩家坦克也可以由AI控制）"""
+        self.ai_controlled = True
+        self.mouse_control = False
+        self.keyboard_control = False
+        self.ai_timer = 0
+        self.target_angle = 0
+        self.move_timer = 0
+        self.shoot_cooldown = self.rng.randint(30, 90)
+        # 最近一次决策的结果：目标、追击用的流场、视线是否通畅
+        self.ai_target = None
+        self.ai_field = None
+        self.ai_clear_shot = False
 
     def move(self, dx, dy, walls, tanks):
         current_speed = self.speed
@@ -282,22 +652,23 @@ class Tank:
         new_y = self.y + dy * current_speed
 
         # 边界检查
-        if new_x < 20 or new_x > SCREEN_WIDTH - self.width - 20:
+        if new_x < 20 or new_x > walls.width - self.width - 20:
             return False
-        if new_y < 20 or new_y > SCREEN_HEIGHT - self.height - 20:
+        if new_y < 20 or new_y > walls.height - self.height - 20:
             return False
 
         new_rect = pygame.Rect(new_x, new_y, self.width, self.height)
 
         # 墙壁碰撞检查
-        for wall in walls:
-            if new_rect.colliderect(wall.rect):
-                return False
+        if walls.find_collision(new_rect):
+            return False
 
-        # 坦克之间碰撞检查（只检查存活的坦克）
+        # 坦克之间碰撞检查（只检查存活的坦克）；坦克大小相同，重叠判断等价于colliderect
+        left = new_rect.x
+        top = new_rect.y
         for tank in tanks:
-            if tank != self and tank.health > 0 and new_rect.colliderect(
-                    pygame.Rect(tank.x, tank.y, tank.width, tank.height)):
+            if tank is not self and tank.health > 0 and \
+                    abs(int(tank.x) - left) < TANK_SIZE and abs(int(tank.y) - top) < TANK_SIZE:
                 return False
 
         self.x = new_x
@@ -337,9 +708,19 @@ class Tank:
         """平滑转向目标"""
         dx = target_x - (self.x + self.width // 2)
         dy = target_y - (self.y + self.height // 2)
-        target_angle = math.degrees(math.atan2(dx, dy)) % 360
+        # 与移动、射击一致：0度朝上，方向向量为(sin, -cos)
+        target_angle = math.degrees(math.atan2(dx, -dy)) % 360
+        return self.turn_towards_angle(target_angle, speed)
+
+    def aim_error(self, target_x, target_y):
+        """炮口朝向与目标方向的夹角（度）"""
+        dx = target_x - (self.x + self.width // 2)
+        dy = target_y - (self.y + self.height // 2)
+        angle_diff = (math.degrees(math.atan2(dx, -dy)) - self.rotation) % 360
+        return min(angle_diff, 360 - angle_diff)
 
-        # 计算角度差
+    def turn_towards_angle(self, target_angle, speed):
+        """以每tick最多speed度的速度转向target_angle，返回转向前与目标的夹角是否小于10度"""
         angle_diff = (target_angle - self.rotation) % 360
         if angle_diff > 180:
             angle_diff -= 360
@@ -358,35 +739,42 @@ class Tank:
     def shoot(self):
         if self.cooldown <= 0:
             angle_rad = math.radians(self.rotation)
+            muzzle_offset = BULLET_TYPES[self.bullet_type]["muzzle_offset"]
+            start_x = self.x + self.width // 2 + math.sin(angle_rad) * muzzle_offset
+            start_y = self.y + self.height // 2 - math.cos(angle_rad) * muzzle_offset
 
-            if self.bullet_type == "normal":
-                start_x = self.x + self.width // 2 + math.sin(angle_rad) * 30
-                start_y = self.y + self.height // 2 - math.cos(angle_rad) * 30
-                bullet = NormalBullet(start_x, start_y, self.rotation, self.is_enemy)
-
-            elif self.bullet_type == "lightning":
-                start_x = self.x + self.width // 2 + math.sin(angle_rad) * 30
-                start_y = self.y + self.height // 2 - math.cos(angle_rad) * 30
-                bullet = LightningBullet(start_x, start_y, self.rotation, self.is_enemy)
-
-            elif self.bullet_type == "big":
-                start_x = self.x + self.width // 2 + math.sin(angle_rad) * 35
-                start_y = self.y + self.height // 2 - math.cos(angle_rad) * 35
-                bullet = BigBullet(start_x, start_y, self.rotation, self.is_enemy)
-
-            self.bullets.append(bullet)
+            self.bullet_manager.spawn(start_x, start_y, self.rotation, self.bullet_type,
+                                      self.tank_id, self.is_enemy)
             self.cooldown = self.cooldown_time
             return True
         return False
 
-    def update_ai(self, players, walls, tanks):
-        """增强的AI逻辑"""
-        if not self.is_enemy:
-            return
+    def follow_path(self, heading, walls, tanks):
+        """沿流场给出的方向前进；正面受阻时沿墙滑动"""
+        angle_diff = (heading - self.rotation) % 360
+        self.turn_towards_angle(heading, AI_PATH_TURN_SPEED)
+        if min(angle_diff, 360 - angle_diff) > AI_PATH_MAX_ANGLE:
+            return True
 
-        self.ai_timer += 1
-        self.move_timer -= 1
+        angle_rad = math.radians(heading)
+        dx = math.sin(angle_rad)
+        dy = -math.cos(angle_rad)
+        if self.move(dx, dy, walls, tanks):
+            return True
+        # 分解到两个坐标轴上，先试分量较大的方向
+        if abs(dx) >= abs(dy):
+            return self.move(math.copysign(1, dx), 0, walls, tanks) or self.move(0, math.copysign(1, dy), walls, tanks)
+        return self.move(0, math.copysign(1, dy), walls, tanks) or self.move(math.copysign(1, dx), 0, walls, tanks)
+
+    def update_ai(self, players, walls, tanks, navigator=None):
+        """完整的AI更新：先做决策再转向移动，players为可攻击的目标坦克"""
+        if not self.ai_controlled:
+            return
+        self.think(players, navigator)
+        self.steer(walls, tanks)
 
+    def think(self, players, navigator=None):
+        """开销较大的AI决策：选最近的目标、取共享流场、查视线。由Game按预算错开调用"""
         # 找到最近的玩家
         closest_player = None
         min_distance = float('inf')
@@ -408,7 +796,21 @@ class Tank:
                 min_distance = distance
                 closest_player = player
 
-        if not closest_player:
+        self.ai_target = closest_player
+        self.ai_field = None
+        # 只有视线通畅才攻击和射击，被墙挡住时继续沿路径绕行
+        self.ai_clear_shot = True
+        if closest_player and navigator is not None:
+            self.ai_field = navigator.field_for(closest_player)
+            self.ai_clear_shot = navigator.clear_shot(self, closest_player)
+
+    def steer(self, walls, tanks):
+        """每tick执行的廉价部分：按最近一次决策转向、移动和射击"""
+        self.ai_timer += 1
+        self.move_timer -= 1
+
+        closest_player = self.ai_target
+        if closest_player is None or closest_player.health <= 0:
             return
 
         player_center_x = closest_player.x + closest_player.width // 2
@@ -419,18 +821,19 @@ class Tank:
         dx = player_center_x - self_center_x
         dy = player_center_y - self_center_y
         distance = math.sqrt(dx * dx + dy * dy)
+        clear_shot = self.ai_clear_shot
 
         # AI行为决策
-        if distance < 200:  # 近距离：攻击
+        if distance < AI_ENGAGE_DISTANCE and clear_shot:  # 近距离：攻击
             # 转向玩家
-            self.rotate_towards(player_center_x, player_center_y, 3)
+            aimed = self.rotate_towards(player_center_x, player_center_y, 3)
 
             # 射击
-            if distance < 250 and random.random() < 0.02:
+            if aimed and distance < AI_FIRE_DISTANCE and self.rng.random() < AI_FIRE_CHANCE:
                 self.shoot()
 
             # 保持距离
-            if distance < 100 and self.move_timer <= 0:
+            if distance < AI_RETREAT_DISTANCE and self.move_timer <= 0:
                 # 后退
                 angle_rad = math.radians(self.rotation)
                 move_success = self.move(-math.sin(angle_rad), math.cos(angle_rad), walls, tanks)
@@ -439,10 +842,14 @@ class Tank:
                     side_angle = self.rotation + 90
                     angle_rad = math.radians(side_angle)
                     self.move(math.sin(angle_rad), -math.cos(angle_rad), walls, tanks)
-                self.move_timer = 30
+                self.move_timer = AI_RETREAT_TIME
 
         else:  # 远距离：寻找玩家
-            if self.move_timer <= 0:
+            heading = self.ai_field.heading(self, closest_player) if self.ai_field is not None else None
+            if heading is not None:
+                # 沿流场的最短路径追击，每tick只查一次所在格子
+                self.follow_path(heading, walls, tanks)
+            elif self.move_timer <= 0:
                 # 转向玩家方向移动
                 self.rotate_towards(player_center_x, player_center_y, 2)
                 angle_rad = math.radians(self.rotation)
@@ -450,16 +857,17 @@ class Tank:
 
                 if not move_success:
                     # 如果移动失败，随机转向
-                    self.rotation = random.choice([0, 90, 180, 270])
-                    self.move_timer = 60
+                    self.rotation = self.rng.choice([0, 90, 180, 270])
+                    self.move_timer = AI_STUCK_TIME
                 else:
-                    self.move_timer = 20
+                    self.move_timer = AI_MOVE_TIME
 
-            # 偶尔射击
-            if random.random() < 0.005:
+            # 视线通畅且大致对准时偶尔射击
+            if clear_shot and self.rng.random() < AI_IDLE_FIRE_CHANCE and \
+                    self.aim_error(player_center_x, player_center_y) < 10:
                 self.shoot()
 
-    def update(self):
+    def update(self, particles):
         if self.cooldown > 0:
             self.cooldown -= 1
 
@@ -483,22 +891,19 @@ class Tank:
             elif effect.effect_type == "speed":
                 self.speed_boost = effect.duration
 
-        # 更新特效粒子
-        self.effect_particles = [p for p in self.effect_particles if p.update()]
-
         # 添加特效粒子
         if self.invincible > 0:
-            self.add_effect_particles(COLORS['invincible_effect'])
+            self.add_effect_particles(particles, COLORS['invincible_effect'])
         if self.speed_boost > 0:
-            self.add_effect_particles(COLORS['speed_effect'])
+            self.add_effect_particles(particles, COLORS['speed_effect'])
 
-    def add_effect_particles(self, color):
-        if random.random() < 0.3:
-            angle = random.uniform(0, 2 * math.pi)
-            distance = random.uniform(20, 35)
+    def add_effect_particles(self, particles, color):
+        if particles.rng.random() < 0.3:
+            angle = particles.rng.uniform(0, 2 * math.pi)
+            distance = particles.rng.uniform(20, 35)
             px = self.x + self.width // 2 + math.cos(angle) * distance
             py = self.y + self.height // 2 + math.sin(angle) * distance
-            self.effect_particles.append(EffectParticle(px, py, color))
+            particles.emit(px, py, color)
 
     def add_status_effect(self, effect_type, duration):
         self.status_effects = [effect for effect in self.status_effects if effect.effect_type != effect_type]
@@ -510,85 +915,49 @@ class Tank:
             self.health = min(self.max_health, self.health + heal_amount)
             return HealText(self.x + self.width // 2, self.y, heal_amount)
         elif power_type == "speed":
-            duration = random.randint(300, 480)  # 5-8秒
+            duration = self.rng.randint(300, 480)  # 5-8秒
             self.add_status_effect("speed", duration)
         elif power_type == "invincible":
-            duration = random.randint(300, 480)  # 5-8秒
+            duration = self.rng.randint(300, 480)  # 5-8秒
             self.add_status_effect("invincible", duration)
         elif power_type == "bullet_upgrade":
-            duration = random.randint(300, 480)  # 5-8秒
+            duration = self.rng.randint(300, 480)  # 5-8秒
             self.bullet_timer = duration
             bullet_types = ["lightning", "big"]
-            self.bullet_type = random.choice(bullet_types)
+            self.bullet_type = self.rng.choice(bullet_types)
             self.add_status_effect(f"bullet_{self.bullet_type}", duration)
         return None
 
-    def draw(self, surface):
+    def sprites(self):
+        """坦克的(精灵, 屏幕位置)列表：车身、推进器火焰、炮管、武器标记、血条"""
         # 只绘制存活的坦克
         if self.health <= 0:
-            return
-
-        for particle in self.effect_particles:
-            particle.draw(surface)
+            return []
 
-        tank_rect = pygame.Rect(self.x, self.y, self.width, self.height)
+        atlas = get_sprite_atlas()
+        x = int(self.x)
+        y = int(self.y)
+        center_x = x + self.width // 2
+        center_y = y + self.height // 2
 
         if self.invincible > 0:
-            if self.invincible % 10 < 5:
-                pygame.draw.rect(surface, (255, 255, 200), tank_rect)
-            else:
-                pygame.draw.rect(surface, self.color, tank_rect)
-            pygame.draw.rect(surface, COLORS['invincible_effect'], tank_rect, 3)
+            body_color = atlas.INVINCIBLE_FLASH if self.invincible % 10 < 5 else self.color
+            items = [(atlas.body(body_color, outlined=True), (x, y))]
         else:
-            pygame.draw.rect(surface, self.color, tank_rect)
+            items = [(atlas.body(self.color), (x, y))]
 
         if self.speed_boost > 0:
-            self.draw_thruster(surface)
-
-        angle_rad = math.radians(self.rotation)
-        end_x = self.x + self.width // 2 + math.sin(angle_rad) * 25
-        end_y = self.y + self.height // 2 - math.cos(angle_rad) * 25
-        start_x = self.x + self.width // 2
-        start_y = self.y + self.height // 2
-
-        pygame.draw.line(surface, (50, 50, 50), (start_x, start_y), (end_x, end_y), 6)
-
-        weapon_colors = {
-            "normal": COLORS['bullet'],
-            "lightning": COLORS['lightning_bullet'],
-            "big": COLORS['big_bullet']
-        }
-        weapon_color = weapon_colors.get(self.bullet_type, COLORS['bullet'])
-        pygame.draw.circle(surface, weapon_color, (int(self.x + 10), int(self.y - 5)), 3)
-
-        # 生命值条
-        bar_width = self.width
-        bar_height = 5
-        fill = (self.health / self.max_health) * bar_width
-        outline_rect = pygame.Rect(self.x, self.y - 10, bar_width, bar_height)
-        fill_rect = pygame.Rect(self.x, self.y - 10, fill, bar_height)
-        pygame.draw.rect(surface, (100, 100, 100), outline_rect)
-
-        # 生命值颜色根据血量变化
-        health_color = (0, 255, 0)  # 绿色
-        if self.health < self.max_health * 0.3:
-            health_color = (255, 0, 0)  # 红色
-        elif self.health < self.max_health * 0.6:
-            health_color = (255, 255, 0)  # 黄色
-
-        pygame.draw.rect(surface, health_color, fill_rect)
-
-    def draw_thruster(self, surface):
-        angle_rad = math.radians(self.rotation)
-
-        thruster_x = self.x + self.width // 2 - math.sin(angle_rad) * 25
-        thruster_y = self.y + self.height // 2 + math.cos(angle_rad) * 25
-
-        flame_size = 8 + (self.thruster_timer // 2)
+            angle_rad = math.radians(self.rotation)
+            thruster_x = int(self.x + self.width // 2 - math.sin(angle_rad) * 25)
+            thruster_y = int(self.y + self.height // 2 + math.cos(angle_rad) * 25)
+            flame_size = 8 + (self.thruster_timer // 2)
+            items.append((atlas.thrusters[flame_size], (thruster_x - flame_size, thruster_y - flame_size)))
 
-        pygame.draw.circle(surface, (255, 255, 0), (int(thruster_x), int(thruster_y)), flame_size - 4)
-        pygame.draw.circle(surface, (255, 150, 0), (int(thruster_x), int(thruster_y)), flame_size - 2)
-        pygame.draw.circle(surface, (255, 50, 0), (int(thruster_x), int(thruster_y)), flame_size)
+        reach = atlas.barrel_reach
+        items.append((atlas.barrel(self.rotation), (center_x - reach, center_y - reach)))
+        items.append((atlas.weapon_marks[self.bullet_type], (x + 10 - 3, y - 5 - 3)))
+        items.append((atlas.health_bar(self.health, self.max_health), (x, y - 10)))
+        return items
 
     def draw_aim_line(self, surface, mouse_pos):
         """绘制鼠标瞄准线"""
@@ -614,67 +983,193 @@ class Tank:
         # 绘制射击范围圆环
         pygame.draw.circle(surface, COLORS['mouse_aim'], mouse_pos, 20, 1)
 
+    def aim_line_bounds(self, mouse_pos):
+        center = (int(self.x) + self.width // 2, int(self.y) + self.height // 2)
+        return pygame.Rect(center, (1, 1)).union(pygame.Rect(mouse_pos, (1, 1))).inflate(44, 44)
 
-class Bullet:
-    def __init__(self, x, y, angle, is_enemy=False):
-        self.x = x
-        self.y = y
-        self.angle = angle
-        self.speed = 7
-        self.radius = 4
-        self.color = COLORS['bullet']
-        self.is_enemy = is_enemy
-        self.damage = 25
-        self.damage_type = "normal"
-
-    def update(self):
-        angle_rad = math.radians(self.angle)
-        self.x += math.sin(angle_rad) * self.speed
-        self.y -= math.cos(angle_rad) * self.speed
 
-    def is_out_of_bounds(self):
-        return (self.x < 0 or self.x > SCREEN_WIDTH or
-                self.y < 0 or self.y > SCREEN_HEIGHT)
+# 单颗子弹的只读快照，供碰撞结算使用
+BulletRecord = namedtuple("BulletRecord", "x y prev_x prev_y radius damage damage_type aoe_radius owner is_enemy")
 
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
 
+def segment_rect_entry(x, y, dx, dy, left, top, right, bottom):
+    """线段(x, y) + t * (dx, dy)（t∈[0, 1]）与矩形相交时返回最早的t，否则返回None"""
+    t_enter = 0.0
+    t_exit = 1.0
+    for start, delta, low, high in ((x, dx, left, right), (y, dy, top, bottom)):
+        if delta == 0:
+            if start <= low or start >= high:
+                return None
+            continue
+        t0 = (low - start) / delta
+        t1 = (high - start) / delta
+        if t0 > t1:
+            t0, t1 = t1, t0
+        t_enter = max(t_enter, t0)
+        t_exit = min(t_exit, t1)
+        if t_enter >= t_exit:
+            return None
+    return t_enter
+
+
+class BulletManager:
+    """以结构化数组(SoA)保存所有子弹：发射时预先计算速度，每帧一次NumPy步进"""
+
+    FIELDS = ("pos", "prev_pos", "vel", "radius", "damage", "kind", "owner", "is_enemy")
+
+    def __init__(self, capacity=BULLET_POOL_SIZE, rng=random):
+        self.capacity = capacity
+        self.rng = rng  # 仅用于绘制闪电火花
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.radius = np.zeros(capacity, dtype=np.int32)
+        self.damage = np.zeros(capacity, dtype=np.int32)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.owner = np.zeros(capacity, dtype=np.int32)
+        self.is_enemy = np.zeros(capacity, dtype=bool)
+        # 各类炮弹累计发射数
+        self.shots_fired = dict.fromkeys(BULLET_KINDS, 0)
+
+    def grow(self):
+        """容量翻倍"""
+        self.capacity *= 2
+        for name in self.FIELDS:
+            old = getattr(self, name)
+            new = np.zeros((self.capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, x, y, angle, bullet_type, owner, is_enemy):
+        if self.count >= self.capacity:
+            self.grow()
+
+        info = BULLET_TYPES[bullet_type]
+        angle_rad = math.radians(angle)
+        i = self.count
+        self.pos[i] = x, y
+        self.prev_pos[i] = x, y
+        self.vel[i] = math.sin(angle_rad) * info["speed"], -math.cos(angle_rad) * info["speed"]
+        self.radius[i] = info["radius"]
+        self.damage[i] = info["damage"]
+        self.kind[i] = BULLET_KINDS.index(bullet_type)
+        self.owner[i] = owner
+        self.is_enemy[i] = is_enemy
+        self.count += 1
+        self.shots_fired[bullet_type] += 1
+
+    def remove(self, i):
+        """交换删除：用最后一颗子弹覆盖第i颗"""
+        last = self.count - 1
+        if i != last:
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                array[i] = array[last]
+        self.count = last
+
+    def remove_mask(self, mask):
+        """删除mask为True的子弹并压缩数组"""
+        n = self.count
+        keep = ~mask
+        live = int(np.count_nonzero(keep))
+        if live < n:
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                array[:live] = array[:n][keep]
+            self.count = live
+
+    def record(self, i):
+        bullet_type = BULLET_KINDS[self.kind[i]]
+        return BulletRecord(float(self.pos[i, 0]), float(self.pos[i, 1]),
+                            float(self.prev_pos[i, 0]), float(self.prev_pos[i, 1]), int(self.radius[i]),
+                            int(self.damage[i]), bullet_type, BULLET_TYPES[bullet_type]["aoe_radius"],
+                            int(self.owner[i]), bool(self.is_enemy[i]))
 
-class NormalBullet(Bullet):
-    def __init__(self, x, y, angle, is_enemy=False):
-        super().__init__(x, y, angle, is_enemy)
-        self.color = COLORS['bullet']
-        self.damage = 25
-        self.damage_type = "normal"
-
-
-class LightningBullet(Bullet):
-    def __init__(self, x, y, angle, is_enemy=False):
-        super().__init__(x, y, angle, is_enemy)
-        self.color = COLORS['lightning_bullet']
-        self.speed = 10
-        self.radius = 3
-        self.damage = 15
-        self.damage_type = "lightning"
-        self.aoe_radius = 60
-
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
-        for i in range(5):
-            offset_x = random.randint(-8, 8)
-            offset_y = random.randint(-8, 8)
-            pygame.draw.circle(surface, (200, 230, 255),
-                               (int(self.x + offset_x), int(self.y + offset_y)), 1)
-
+    def update(self):
+        """所有子弹前进一步"""
+        n = self.count
+        if n == 0:
+            return
+        self.prev_pos[:n] = self.pos[:n]
+        self.pos[:n] += self.vel[:n]
 
-class BigBullet(Bullet):
-    def __init__(self, x, y, angle, is_enemy=False):
-        super().__init__(x, y, angle, is_enemy)
-        self.color = COLORS['big_bullet']
-        self.speed = 4
-        self.radius = 10
-        self.damage = 40
-        self.damage_type = "big"
+    def cull_out_of_bounds(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        """删除飞出世界边界的子弹"""
+        n = self.count
+        if n == 0:
+            return
+        x = self.pos[:n, 0]
+        y = self.pos[:n, 1]
+        out_of_bounds = (x < 0) | (x > width) | (y < 0) | (y > height)
+        if out_of_bounds.any():
+            self.remove_mask(out_of_bounds)
+
+    def swept_boxes(self):
+        """返回每颗子弹本帧扫过区域的包围盒(min_x, min_y, max_x, max_y)"""
+        n = self.count
+        radius = self.radius[:n]
+        low = np.minimum(self.prev_pos[:n], self.pos[:n])
+        high = np.maximum(self.prev_pos[:n], self.pos[:n])
+        return low[:, 0] - radius, low[:, 1] - radius, high[:, 0] + radius, high[:, 1] + radius
+
+    def wall_candidates(self, walls, boxes=None):
+        """粗筛可能撞墙的子弹：扫掠包围盒不超过2x2格时查占用数组，更大的一律交给精确检测"""
+        min_x, min_y, max_x, max_y = self.swept_boxes() if boxes is None else boxes
+        x0 = (min_x // GRID_SIZE).astype(np.int32)
+        y0 = (min_y // GRID_SIZE).astype(np.int32)
+        x1 = (max_x // GRID_SIZE).astype(np.int32)
+        y1 = (max_y // GRID_SIZE).astype(np.int32)
+        large = (x1 - x0 > 1) | (y1 - y0 > 1)
+
+        # np.clip对小数组的固定开销较大，这里直接用minimum/maximum
+        occupancy = walls.occupancy
+        max_col = occupancy.shape[0] - 1
+        max_row = occupancy.shape[1] - 1
+        x0 = np.minimum(np.maximum(x0, 0), max_col)
+        x1 = np.minimum(np.maximum(x1, 0), max_col)
+        y0 = np.minimum(np.maximum(y0, 0), max_row)
+        y1 = np.minimum(np.maximum(y1, 0), max_row)
+        return large | occupancy[x0, y0] | occupancy[x0, y1] | occupancy[x1, y0] | occupancy[x1, y1]
+
+    def tank_candidates(self, tank, boxes=None):
+        """粗筛扫掠包围盒与坦克重叠、且可以对其造成伤害的子弹"""
+        n = self.count
+        min_x, min_y, max_x, max_y = self.swept_boxes() if boxes is None else boxes
+        tank_left = int(tank.x)
+        tank_top = int(tank.y)
+        overlap = ((min_x < tank_left + TANK_SIZE) & (max_x > tank_left) &
+                   (min_y < tank_top + TANK_SIZE) & (max_y > tank_top))
+        overlap &= self.owner[:n] != tank.tank_id
+        if tank.is_enemy:
+            # 敌人之间不能互相伤害
+            overlap &= ~self.is_enemy[:n]
+        return overlap
+
+    def sprites(self, alpha=1.0, view=None):
+        """子弹的(精灵, 屏幕位置)列表；view为镜头可见区域（世界坐标），只包含其中的子弹"""
+        n = self.count
+        if n == 0:
+            return []
+        pos = (self.prev_pos[:n] + (self.pos[:n] - self.prev_pos[:n]) * alpha).astype(np.int32)
+        radii = self.radius[:n]
+        kinds = self.kind[:n]
+        if view is not None:
+            # 留出闪电火花的余量
+            margin = radii + 8
+            visible = ((pos[:, 0] + margin > view.left) & (pos[:, 0] - margin < view.right) &
+                       (pos[:, 1] + margin > view.top) & (pos[:, 1] - margin < view.bottom))
+            pos = pos[visible] - view.topleft
+            radii = radii[visible]
+            kinds = kinds[visible]
+        atlas = get_sprite_atlas()
+        items = []
+        for (x, y), radius, kind in zip(pos.tolist(), radii.tolist(), kinds.tolist()):
+            bullet_type = BULLET_KINDS[kind]
+            items.append((atlas.bullets[bullet_type], (x - radius, y - radius)))
+            if bullet_type == "lightning":
+                items.append((atlas.sparks[self.rng.randrange(LIGHTNING_SPARK_FRAMES)], (x - 9, y - 9)))
+        return items
 
 
 class Wall:
@@ -682,11 +1177,292 @@ class Wall:
         self.rect = pygame.Rect(x, y, GRID_SIZE, GRID_SIZE)
         self.breakable = breakable
 
-    def draw(self, surface):
+    def draw(self, surface, offset=(0, 0)):
+        rect = self.rect.move(-offset[0], -offset[1])
         color = COLORS['breakable_wall'] if self.breakable else COLORS['wall']
-        pygame.draw.rect(surface, color, self.rect)
+        pygame.draw.rect(surface, color, rect)
         if self.breakable:
-            pygame.draw.rect(surface, (80, 80, 100), self.rect, 2)
+            pygame.draw.rect(surface, (80, 80, 100), rect, 2)
+
+
+class WallGrid:
+    """按GRID_SIZE网格索引的墙壁集合，碰撞查询只检查矩形覆盖的格子。
+    墙壁同时按CHUNK_CELLS×CHUNK_CELLS的块分组，绘制时只遍历可见的块"""
+
+    def __init__(self, walls=(), width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        # 世界大小（像素）
+        self.width = width
+        self.height = height
+        cols = width // GRID_SIZE
+        rows = height // GRID_SIZE
+        self.cells = {}
+        # 块坐标 -> {格子: 墙壁}，以及每个块的版本号（块内墙壁变化时加1，用于作废预渲染）
+        self.chunks = {}
+        self.chunk_versions = {}
+        # 占用格子的布尔数组，下标为[grid_x, grid_y]，供向量化查询使用
+        self.occupancy = np.zeros((cols, rows), dtype=bool)
+        self.breakable = np.zeros((cols, rows), dtype=bool)
+        # 墙壁布局每变化一次加1，寻路等缓存据此判断是否失效
+        self.version = 0
+        # 地图生成时的连通性统计（见repair_connectivity）
+        self.connectivity = None
+        for wall in walls:
+            self.append(wall)
+
+    @staticmethod
+    def cell_of(wall):
+        return wall.rect.x // GRID_SIZE, wall.rect.y // GRID_SIZE
+
+    @staticmethod
+    def chunk_of(cell):
+        return cell[0] // CHUNK_CELLS, cell[1] // CHUNK_CELLS
+
+    def touch_chunk(self, chunk):
+        self.chunk_versions[chunk] = self.chunk_versions.get(chunk, 0) + 1
+
+    def chunks_in_rect(self, rect):
+        """与rect（世界坐标）重叠的所有块坐标"""
+        chunk_pixels = CHUNK_CELLS * GRID_SIZE
+        for chunk_y in range(max(0, rect.top // chunk_pixels),
+                             min(self.height - 1, rect.bottom - 1) // chunk_pixels + 1):
+            for chunk_x in range(max(0, rect.left // chunk_pixels),
+                                 min(self.width - 1, rect.right - 1) // chunk_pixels + 1):
+                yield chunk_x, chunk_y
+
+    def walls_in_chunk(self, chunk):
+        return self.chunks.get(chunk, {}).values()
+
+    def set_occupied(self, cell, occupied, breakable=False):
+        grid_x, grid_y = cell
+        if 0 <= grid_x < self.occupancy.shape[0] and 0 <= grid_y < self.occupancy.shape[1]:
+            self.occupancy[grid_x, grid_y] = occupied
+            self.breakable[grid_x, grid_y] = occupied and breakable
+
+    def append(self, wall):
+        cell = self.cell_of(wall)
+        chunk = self.chunk_of(cell)
+        self.cells[cell] = wall
+        self.chunks.setdefault(chunk, {})[cell] = wall
+        self.set_occupied(cell, True, wall.breakable)
+        self.touch_chunk(chunk)
+        self.version += 1
+
+    def remove(self, wall):
+        cell = self.cell_of(wall)
+        chunk = self.chunk_of(cell)
+        del self.cells[cell]
+        del self.chunks[chunk][cell]
+        self.set_occupied(cell, False)
+        self.touch_chunk(chunk)
+        self.version += 1
+
+    def get(self, grid_x, grid_y):
+        return self.cells.get((grid_x, grid_y))
+
+    def __iter__(self):
+        return iter(self.cells.values())
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, wall):
+        return self.cells.get(self.cell_of(wall)) is wall
+
+    def query(self, rect):
+        """返回与rect重叠的所有墙壁"""
+        hits = []
+        for grid_x in range(rect.left // GRID_SIZE, (rect.right - 1) // GRID_SIZE + 1):
+            for grid_y in range(rect.top // GRID_SIZE, (rect.bottom - 1) // GRID_SIZE + 1):
+                wall = self.cells.get((grid_x, grid_y))
+                if wall is not None and rect.colliderect(wall.rect):
+                    hits.append(wall)
+        return hits
+
+    def find_collision(self, rect):
+        """返回第一个与rect重叠的墙壁，没有则返回None"""
+        for grid_x in range(rect.left // GRID_SIZE, (rect.right - 1) // GRID_SIZE + 1):
+            for grid_y in range(rect.top // GRID_SIZE, (rect.bottom - 1) // GRID_SIZE + 1):
+                wall = self.cells.get((grid_x, grid_y))
+                if wall is not None and rect.colliderect(wall.rect):
+                    return wall
+        return None
+
+
+# 流场的8个邻接方向；斜向移动要求两侧的直向格子都为空，避免擦墙角
+NEIGHBOR_STEPS = ((0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (1, -1), (-1, 1), (1, 1))
+
+
+def cell_at(x, y):
+    """像素坐标所在的网格"""
+    return int(x // GRID_SIZE), int(y // GRID_SIZE)
+
+
+class FlowField:
+    """以goal格子为终点的流场：对整张网格做一次BFS，每个格子记录走向终点的下一个格子"""
+
+    def __init__(self, walls, goal):
+        self.goal = goal
+        self.version = walls.version
+        occupancy = walls.occupancy.tolist()
+        cols = len(occupancy)
+        rows = len(occupancy[0])
+        # next_cell[x][y]为下一步要去的格子，None表示不可达
+        self.next_cell = [[None] * rows for _ in range(cols)]
+        self.distance = [[-1] * rows for _ in range(cols)]
+
+        goal_x, goal_y = goal
+        if not (0 <= goal_x < cols and 0 <= goal_y < rows) or occupancy[goal_x][goal_y]:
+            return
+        self.distance[goal_x][goal_y] = 0
+        self.next_cell[goal_x][goal_y] = goal
+
+        # 从终点反向扩展，先扩展到的邻居就是最短路径上的上一格
+        queue = deque([goal])
+        while queue:
+            x, y = queue.popleft()
+            distance = self.distance[x][y] + 1
+            for dx, dy in NEIGHBOR_STEPS:
+                nx = x + dx
+                ny = y + dy
+                if not (0 <= nx < cols and 0 <= ny < rows):
+                    continue
+                if self.distance[nx][ny] >= 0 or occupancy[nx][ny]:
+                    continue
+                if dx and dy and (occupancy[nx][y] or occupancy[x][ny]):
+                    continue
+                self.distance[nx][ny] = distance
+                self.next_cell[nx][ny] = (x, y)
+                queue.append((nx, ny))
+
+    def is_valid(self, walls, goal):
+        return self.goal == goal and self.version == walls.version
+
+    def next_step(self, cell):
+        """返回cell走向终点的下一个格子，不可达时返回None"""
+        x, y = cell
+        if 0 <= x < len(self.next_cell) and 0 <= y < len(self.next_cell[0]):
+            return self.next_cell[x][y]
+        return None
+
+    def heading(self, tank, target):
+        """tank沿流场追击target时应朝向的角度，不可达时返回None"""
+        center_x = tank.x + tank.width / 2
+        center_y = tank.y + tank.height / 2
+        cell = cell_at(center_x, center_y)
+        next_cell = self.next_step(cell)
+        if next_cell is None:
+            return None
+
+        # 朝下一个格子的中心前进；已在终点格子时直接朝目标前进
+        if next_cell == cell:
+            goal_x = target.x + target.width / 2
+            goal_y = target.y + target.height / 2
+        else:
+            goal_x = (next_cell[0] + 0.5) * GRID_SIZE
+            goal_y = (next_cell[1] + 0.5) * GRID_SIZE
+        return math.degrees(math.atan2(goal_x - center_x, center_y - goal_y)) % 360
+
+
+class LineOfSight:
+    """格子到格子的视线查询：在网格上做DDA遍历，结果按(格子, 格子)缓存。
+    被挡住的结果记下挡住视线的格子，该墙被摧毁时只作废相关的条目"""
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.cache = {}
+        # 挡住视线的墙格 -> 被它挡住的格子对
+        self.blocked_by = {}
+        self.version = walls.version
+        self.wall_count = len(walls)
+
+    def sync(self):
+        """墙壁布局变化后作废受影响的缓存"""
+        walls = self.walls
+        if walls.version == self.version:
+            return
+        if len(walls) > self.wall_count:
+            # 新增了墙壁，原来通畅的视线也可能被挡住
+            self.cache.clear()
+            self.blocked_by.clear()
+        else:
+            occupancy = walls.occupancy
+            for blocker in [cell for cell in self.blocked_by if not occupancy[cell]]:
+                for pair in self.blocked_by.pop(blocker):
+                    self.cache.pop(pair, None)
+        self.version = walls.version
+        self.wall_count = len(walls)
+
+    def is_clear(self, cell_a, cell_b):
+        """两个格子中心之间的连线是否不经过任何墙格"""
+        self.sync()
+        pair = (cell_a, cell_b) if cell_a <= cell_b else (cell_b, cell_a)
+        if pair in self.cache:
+            return self.cache[pair] is None
+
+        blocker = self.trace(*pair)
+        self.cache[pair] = blocker
+        if blocker is not None:
+            self.blocked_by.setdefault(blocker, set()).add(pair)
+        return blocker is None
+
+    def trace(self, cell_a, cell_b):
+        """DDA遍历连线经过的格子，返回第一个墙格，通畅时返回None"""
+        occupancy = self.walls.occupancy
+        x, y = cell_a
+        end_x, end_y = cell_b
+        dx = end_x - x
+        dy = end_y - y
+        step_x = (dx > 0) - (dx < 0)
+        step_y = (dy > 0) - (dy < 0)
+        # 从格子中心出发，到下一条竖线/横线的参数距离及每跨一格的参数增量
+        delta_x = 1 / abs(dx) if dx else math.inf
+        delta_y = 1 / abs(dy) if dy else math.inf
+        t_x = delta_x / 2
+        t_y = delta_y / 2
+
+        while (x, y) != (end_x, end_y):
+            if occupancy[x, y]:
+                return x, y
+            if abs(t_x - t_y) < 1e-9:
+                # 恰好穿过格点：两侧的格子都算在路径上
+                if occupancy[x + step_x, y]:
+                    return x + step_x, y
+                if occupancy[x, y + step_y]:
+                    return x, y + step_y
+                x += step_x
+                y += step_y
+                t_x += delta_x
+                t_y += delta_y
+            elif t_x < t_y:
+                x += step_x
+                t_x += delta_x
+            else:
+                y += step_y
+                t_y += delta_y
+        return (x, y) if occupancy[x, y] else None
+
+
+class Navigator:
+    """所有AI共享的寻路服务：每个目标坦克一个流场，
+    只有目标换了格子或墙壁布局变化（可破坏墙被摧毁）时才重新计算"""
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.fields = {}
+        self.sight = LineOfSight(walls)
+
+    def clear_shot(self, tank, target):
+        """tank与target所在格子之间没有墙壁遮挡"""
+        return self.sight.is_clear(cell_at(tank.x + tank.width / 2, tank.y + tank.height / 2),
+                                   cell_at(target.x + target.width / 2, target.y + target.height / 2))
+
+    def field_for(self, target):
+        goal = cell_at(target.x + target.width / 2, target.y + target.height / 2)
+        field = self.fields.get(target.tank_id)
+        if field is None or not field.is_valid(self.walls, goal):
+            field = FlowField(self.walls, goal)
+            self.fields[target.tank_id] = field
+        return field
 
 
 class Explosion:
@@ -703,9 +1479,8 @@ class Explosion:
         if self.radius >= self.max_radius:
             self.active = False
 
-    def draw(self, surface):
-        pygame.draw.circle(surface, COLORS['explosion'], (int(self.x), int(self.y)), self.radius)
-        pygame.draw.circle(surface, (255, 255, 100), (int(self.x), int(self.y)), self.radius - 5)
+    def sprites(self):
+        return [(get_sprite_atlas().explosion(self.radius), (int(self.x) - self.radius, int(self.y) - self.radius))]
 
 
 class PowerUp:
@@ -722,138 +1497,207 @@ class PowerUp:
         self.blink_timer = (self.blink_timer + 1) % 30
         self.float_timer += 1
 
-    def draw(self, surface):
+    def sprites(self):
         float_offset = math.sin(self.float_timer * 0.1) * 3
-        draw_y = self.y + float_offset
+        sprite = get_sprite_atlas().powerup(self.type, self.color, self.radius, self.blink_timer < 15)
+        x = int(self.x) - sprite.get_width() // 2
+        y = int(self.y + float_offset) - sprite.get_height() // 2
+        return [(sprite, (x, y))]
 
-        if self.blink_timer < 15:
-            pygame.draw.circle(surface, self.color, (int(self.x), int(draw_y)), self.radius)
-            pygame.draw.circle(surface, (255, 255, 255), (int(self.x), int(draw_y)), self.radius - 5)
 
-        font = get_chinese_font(18)
-        if self.type == "health":
-            icon_text = font.render("❤️", True, (255, 255, 255))
-        elif self.type == "speed":
-            icon_text = font.render("⚡", True, (255, 255, 255))
-        elif self.type == "invincible":
-            icon_text = font.render("🛡️", True, (255, 255, 255))
-        elif self.type == "bullet_upgrade":
-            icon_text = font.render("★", True, (255, 255, 255))
+class MapGenerationError(RuntimeError):
+    """地图或出生点无法按要求生成（合法格子不够）"""
 
-        text_rect = icon_text.get_rect(center=(self.x, draw_y))
-        surface.blit(icon_text, text_rect)
 
+class CellSampler:
+    """合法格子集合：支持O(1)删除和无放回随机抽取，迭代顺序只取决于插入顺序"""
 
-def create_random_map():
-    """生成优化后的随机地图：1格墙壁+合理缝隙"""
-    walls = []
+    def __init__(self, cells=()):
+        # cells中不能有重复格子
+        self.cells = list(cells)
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return cell in self.index
+
+    def add(self, cell):
+        if cell not in self.index:
+            self.index[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def discard(self, cell):
+        """交换删除：用最后一个格子填补空位"""
+        i = self.index.pop(cell, None)
+        if i is None:
+            return
+        last = self.cells.pop()
+        if i < len(self.cells):
+            self.cells[i] = last
+            self.index[last] = i
+
+    def pop_random(self, rng):
+        cell = self.cells[rng.randrange(len(self.cells))]
+        self.discard(cell)
+        return cell
+
+
+def spawn_area_cells(area):
+    """出生区域内坦克可以对齐放置的所有格子"""
+    return [(grid_x, grid_y)
+            for grid_y in range(area.top // GRID_SIZE, (area.bottom - TANK_SIZE) // GRID_SIZE + 1)
+            for grid_x in range(area.left // GRID_SIZE, (area.right - TANK_SIZE) // GRID_SIZE + 1)]
+
+
+def create_random_map(rng=random, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+    """生成优化后的随机地图：1格墙壁+合理缝隙，width/height为世界大小（像素）。
+    先算出所有合法格子，再无放回抽样，每放一堵墙只更新相邻格子的合法性，耗时与格子数成正比"""
+    walls = WallGrid(width=width, height=height)
+    cols = width // GRID_SIZE
+    rows = height // GRID_SIZE
+    # 墙壁数量按面积相对一屏的倍数放大
+    area_scale = (width * height) / (SCREEN_WIDTH * SCREEN_HEIGHT)
 
     # 1. 边界墙（不可破坏，固定1格厚度）
     # 上边界
-    for x in range(0, SCREEN_WIDTH, GRID_SIZE):
+    for x in range(0, width, GRID_SIZE):
         walls.append(Wall(x, 0, breakable=False))
     # 下边界
-    for x in range(0, SCREEN_WIDTH, GRID_SIZE):
-        walls.append(Wall(x, SCREEN_HEIGHT - GRID_SIZE, breakable=False))
+    for x in range(0, width, GRID_SIZE):
+        walls.append(Wall(x, height - GRID_SIZE, breakable=False))
     # 左边界
-    for y in range(GRID_SIZE, SCREEN_HEIGHT - GRID_SIZE, GRID_SIZE):
+    for y in range(GRID_SIZE, height - GRID_SIZE, GRID_SIZE):
         walls.append(Wall(0, y, breakable=False))
     # 右边界
-    for y in range(GRID_SIZE, SCREEN_HEIGHT - GRID_SIZE, GRID_SIZE):
-        walls.append(Wall(SCREEN_WIDTH - GRID_SIZE, y, breakable=False))
+    for y in range(GRID_SIZE, height - GRID_SIZE, GRID_SIZE):
+        walls.append(Wall(width - GRID_SIZE, y, breakable=False))
 
     # 2. 定义出生区域
     player_spawn_area = pygame.Rect(
-        GRID_SIZE * 2, SCREEN_HEIGHT - GRID_SIZE * 5,
+        GRID_SIZE * 2, height - GRID_SIZE * 5,
         GRID_SIZE * 6, GRID_SIZE * 3
     )
     enemy_spawn_area = pygame.Rect(
         GRID_SIZE * 2, GRID_SIZE * 2,
-        GRID_SIZE * 15, GRID_SIZE * 4
+        width - GRID_SIZE * 5, GRID_SIZE * 4
     )
 
-    # 3. 随机生成固定墙壁
-    fixed_wall_count = random.randint(15, MAX_FIXED_WALLS)
-    used_grid = set()
-
-    for _ in range(fixed_wall_count):
-        while True:
-            grid_x = random.randint(1, (SCREEN_WIDTH - GRID_SIZE * 2) // GRID_SIZE)
-            grid_y = random.randint(1, (SCREEN_HEIGHT - GRID_SIZE * 2) // GRID_SIZE)
-            x = grid_x * GRID_SIZE
-            y = grid_y * GRID_SIZE
-
-            wall_rect = pygame.Rect(x, y, GRID_SIZE, GRID_SIZE)
-            if wall_rect.colliderect(player_spawn_area) or wall_rect.colliderect(enemy_spawn_area):
-                continue
-
-            if (grid_x, grid_y) in used_grid:
-                continue
+    # 3. 合法格子：边界内、不在出生区域内；放墙后，已有两个直向相邻墙的格子不再合法
+    def covered_cells(area):
+        return {(grid_x, grid_y)
+                for grid_x in range(area.left // GRID_SIZE, (area.right - 1) // GRID_SIZE + 1)
+                for grid_y in range(area.top // GRID_SIZE, (area.bottom - 1) // GRID_SIZE + 1)}
+
+    spawn_cells = covered_cells(player_spawn_area) | covered_cells(enemy_spawn_area)
+    eligible = CellSampler((grid_x, grid_y) for grid_y in range(1, rows - 1) for grid_x in range(1, cols - 1)
+                           if (grid_x, grid_y) not in spawn_cells)
+    adjacent_count = {}
+
+    def place_walls(count, breakable):
+        for placed in range(count):
+            if not eligible:
+                kind = "可破坏墙壁" if breakable else "固定墙壁"
+                raise MapGenerationError(
+                    f"{width}x{height} 地图只能放下 {placed}/{count} 个{kind}：合法格子已用完")
+            grid_x, grid_y = eligible.pop_random(rng)
+            walls.append(Wall(grid_x * GRID_SIZE, grid_y * GRID_SIZE, breakable=breakable))
+            for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+                neighbor = (grid_x + dx, grid_y + dy)
+                adjacent_count[neighbor] = adjacent_count.get(neighbor, 0) + 1
+                if adjacent_count[neighbor] > 1:
+                    eligible.discard(neighbor)
 
-            has_near_wall = False
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if (grid_x + dx, grid_y + dy) in used_grid:
-                        has_near_wall = True
-                        break
-                if has_near_wall:
-                    break
+    # 4. 随机生成固定墙壁
+    place_walls(rng.randint(round(15 * area_scale), round(MAX_FIXED_WALLS * area_scale)), False)
 
-            adjacent_count = 0
-            for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-                if (grid_x + dx, grid_y + dy) in used_grid:
-                    adjacent_count += 1
-            if adjacent_count > 1:
-                continue
+    # 5. 随机生成可破坏墙壁
+    place_walls(rng.randint(round(20 * area_scale), round(MAX_BREAKABLE_WALLS * area_scale)), True)
 
-            used_grid.add((grid_x, grid_y))
-            walls.append(Wall(x, y, breakable=False))
-            break
+    # 6. 连通性检查：被固定墙围死的区域打通
+    walls.connectivity = repair_connectivity(walls, (player_spawn_area.x // GRID_SIZE, player_spawn_area.y // GRID_SIZE))
 
-    # 4. 随机生成可破坏墙壁
-    breakable_wall_count = random.randint(20, MAX_BREAKABLE_WALLS)
+    return walls
 
-    for _ in range(breakable_wall_count):
-        while True:
-            grid_x = random.randint(1, (SCREEN_WIDTH - GRID_SIZE * 2) // GRID_SIZE)
-            grid_y = random.randint(1, (SCREEN_HEIGHT - GRID_SIZE * 2) // GRID_SIZE)
-            x = grid_x * GRID_SIZE
-            y = grid_y * GRID_SIZE
 
-            wall_rect = pygame.Rect(x, y, GRID_SIZE, GRID_SIZE)
-            if wall_rect.colliderect(player_spawn_area) or wall_rect.colliderect(enemy_spawn_area):
+def repair_connectivity(walls, anchor):
+    """以anchor格子（玩家出生区域）为起点做4邻接洪水填充，只把固定墙当作障碍。
+    每个走不到的空地区域沿"穿过固定墙最少"的路径打通，路径上的固定墙改为可破坏墙。
+    返回连通性统计"""
+    blocking = (walls.occupancy & ~walls.breakable).tolist()
+    cols = len(blocking)
+    rows = len(blocking[0])
+    steps = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+    # 从anchor所在区域出发做0-1 BFS：进入空地代价0，进入内部固定墙代价1，边界墙不可穿过。
+    # cost为0的格子就是原本连通的区域
+    cost = [[-1] * rows for _ in range(cols)]
+    parent = {}
+    anchor_x, anchor_y = anchor
+    cost[anchor_x][anchor_y] = 0
+    queue = deque([anchor])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in steps:
+            nx = x + dx
+            ny = y + dy
+            if not (0 < nx < cols - 1 and 0 < ny < rows - 1):
                 continue
-
-            if (grid_x, grid_y) in used_grid:
+            step_cost = cost[x][y] + blocking[nx][ny]
+            if cost[nx][ny] != -1 and cost[nx][ny] <= step_cost:
                 continue
-
-            has_near_wall = False
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if (grid_x + dx, grid_y + dy) in used_grid:
-                        has_near_wall = True
-                        break
-                if has_near_wall:
-                    break
-
-            adjacent_count = 0
-            for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-                if (grid_x + dx, grid_y + dy) in used_grid:
-                    adjacent_count += 1
-            if adjacent_count > 1:
+            cost[nx][ny] = step_cost
+            parent[(nx, ny)] = (x, y)
+            if blocking[nx][ny]:
+                queue.append((nx, ny))
+            else:
+                queue.appendleft((nx, ny))
+
+    # 找出走不到的空地区域
+    free_cells = 0
+    sealed = []
+    seen = set()
+    for x in range(1, cols - 1):
+        for y in range(1, rows - 1):
+            if blocking[x][y]:
                 continue
-
-            used_grid.add((grid_x, grid_y))
-            walls.append(Wall(x, y, breakable=True))
-            break
-
-    return walls
-
-
-def create_tanks_safely(walls, game_mode):
-    """根据游戏模式创建坦克"""
+            free_cells += 1
+            if cost[x][y] == 0 or (x, y) in seen:
+                continue
+            region = [(x, y)]
+            seen.add((x, y))
+            for cx, cy in region:
+                for dx, dy in steps:
+                    neighbor = (cx + dx, cy + dy)
+                    if neighbor not in seen and not blocking[neighbor[0]][neighbor[1]]:
+                        seen.add(neighbor)
+                        region.append(neighbor)
+            sealed.append(region)
+
+    # 每个封闭区域从代价最小的格子回溯到连通区域，把沿途的固定墙改为可破坏墙
+    converted = 0
+    for region in sealed:
+        cell = min(region, key=lambda c: cost[c[0]][c[1]])
+        while cost[cell[0]][cell[1]] > 0:
+            wall = walls.get(*cell)
+            if wall is not None and not wall.breakable:
+                walls.remove(wall)
+                walls.append(Wall(wall.rect.x, wall.rect.y, breakable=True))
+                converted += 1
+            cell = parent[cell]
+
+    return {
+        "free_cells": free_cells,
+        "components": 1 + len(sealed),
+        "sealed_cells": sum(len(region) for region in sealed),
+        "converted_walls": converted,
+    }
+
+
+def create_tanks_safely(walls, game_mode, rng=random):
+    """根据游戏模式创建坦克：在各出生区域的空闲格子中无放回抽样，格子不够时报错"""
     tanks = []
-    positions_tried = set()
 
     mode_config = GAME_MODES[game_mode]
     player_count = mode_config["player_count"]
@@ -861,7 +1705,7 @@ def create_tanks_safely(walls, game_mode):
 
     # 玩家1出生区域
     player1_spawn_area = pygame.Rect(
-        GRID_SIZE * 2, SCREEN_HEIGHT - GRID_SIZE * 5,
+        GRID_SIZE * 2, walls.height - GRID_SIZE * 5,
         GRID_SIZE * 6, GRID_SIZE * 3
     )
 
@@ -871,163 +1715,89 @@ def create_tanks_safely(walls, game_mode):
         GRID_SIZE * 6, GRID_SIZE * 3
     )
 
-    # 敌人出生区域（右上角）
-    enemy_spawn_area = pygame.Rect(
-        SCREEN_WIDTH - GRID_SIZE * 8, GRID_SIZE * 2,
-        GRID_SIZE * 6, GRID_SIZE * 3
-    )
+    # 敌人出生区域（右上角）；敌人较多时向左下扩展，留出约1.5倍的格子
+    if enemy_count <= 9:
+        enemy_spawn_area = pygame.Rect(
+            walls.width - GRID_SIZE * 8, GRID_SIZE * 2,
+            GRID_SIZE * 6, GRID_SIZE * 3
+        )
+    else:
+        enemy_spawn_area = pygame.Rect(
+            walls.width - GRID_SIZE * 12, GRID_SIZE * 2,
+            GRID_SIZE * 10, GRID_SIZE * -(-enemy_count * 3 // 20)
+        )
+
+    # 坦克都对齐到格子左上角且小于一格，所以每个格子最多一辆坦克
+    taken = set()
+
+    def spawn(area, count, **tank_kwargs):
+        free = CellSampler(cell for cell in spawn_area_cells(area)
+                           if cell not in taken and walls.get(*cell) is None)
+        if len(free) < count:
+            raise MapGenerationError(f"{game_mode}: 出生区域只有 {len(free)} 个空闲格子，需要 {count} 个")
+        for _ in range(count):
+            cell = free.pop_random(rng)
+            taken.add(cell)
+            tanks.append(Tank(cell[0] * GRID_SIZE, cell[1] * GRID_SIZE, rng=rng, **tank_kwargs))
 
     # 创建玩家1
     if player_count >= 1:
-        while True:
-            grid_x = random.randint(
-                player1_spawn_area.left // GRID_SIZE,
-                (player1_spawn_area.right - TANK_SIZE) // GRID_SIZE
-            )
-            grid_y = random.randint(
-                player1_spawn_area.top // GRID_SIZE,
-                (player1_spawn_area.bottom - TANK_SIZE) // GRID_SIZE
-            )
-            x = grid_x * GRID_SIZE
-            y = grid_y * GRID_SIZE
-
-            pos_key = (grid_x, grid_y)
-            if pos_key in positions_tried:
-                if len(positions_tried) > 100:
-                    positions_tried.clear()
-                continue
-            positions_tried.add(pos_key)
-
-            tank_rect = pygame.Rect(x, y, TANK_SIZE, TANK_SIZE)
-            collision = False
-
-            for wall in walls:
-                if tank_rect.colliderect(wall.rect):
-                    collision = True
-                    break
-
-            for tank in tanks:
-                if tank_rect.colliderect(pygame.Rect(tank.x, tank.y, TANK_SIZE, TANK_SIZE)):
-                    collision = True
-                    break
-
-            if not collision:
-                tanks.append(Tank(x, y, COLORS['player']))
-                break
+        spawn(player1_spawn_area, 1, color=COLORS['player'])
 
     # 创建玩家2
     if player_count >= 2:
-        while True:
-            grid_x = random.randint(
-                player2_spawn_area.left // GRID_SIZE,
-                (player2_spawn_area.right - TANK_SIZE) // GRID_SIZE
-            )
-            grid_y = random.randint(
-                player2_spawn_area.top // GRID_SIZE,
-                (player2_spawn_area.bottom - TANK_SIZE) // GRID_SIZE
-            )
-            x = grid_x * GRID_SIZE
-            y = grid_y * GRID_SIZE
-
-            pos_key = (grid_x, grid_y)
-            if pos_key in positions_tried:
-                if len(positions_tried) > 100:
-                    positions_tried.clear()
-                continue
-            positions_tried.add(pos_key)
-
-            tank_rect = pygame.Rect(x, y, TANK_SIZE, TANK_SIZE)
-            collision = False
-
-            for wall in walls:
-                if tank_rect.colliderect(wall.rect):
-                    collision = True
-                    break
-
-            for tank in tanks:
-                if tank_rect.colliderect(pygame.Rect(tank.x, tank.y, TANK_SIZE, TANK_SIZE)):
-                    collision = True
-                    break
-
-            if not collision:
-                tanks.append(Tank(x, y, COLORS['player2'], is_player2=True))
-                break
+        spawn(player2_spawn_area, 1, color=COLORS['player2'], is_player2=True)
 
     # 创建敌人
-    for _ in range(enemy_count):
-        while True:
-            grid_x = random.randint(
-                enemy_spawn_area.left // GRID_SIZE,
-                (enemy_spawn_area.right - TANK_SIZE) // GRID_SIZE
-            )
-            grid_y = random.randint(
-                enemy_spawn_area.top // GRID_SIZE,
-                (enemy_spawn_area.bottom - TANK_SIZE) // GRID_SIZE
-            )
-            x = grid_x * GRID_SIZE
-            y = grid_y * GRID_SIZE
-
-            pos_key = (grid_x, grid_y)
-            if pos_key in positions_tried:
-                if len(positions_tried) > 100:
-                    positions_tried.clear()
-                continue
-            positions_tried.add(pos_key)
-
-            tank_rect = pygame.Rect(x, y, TANK_SIZE, TANK_SIZE)
-            collision = False
-
-            for wall in walls:
-                if tank_rect.colliderect(wall.rect):
-                    collision = True
-                    break
-
-            for tank in tanks:
-                if tank_rect.colliderect(pygame.Rect(tank.x, tank.y, TANK_SIZE, TANK_SIZE)):
-                    collision = True
-                    break
-
-            if not collision:
-                tanks.append(Tank(x, y, COLORS['enemy'], is_enemy=True))
-                break
+    spawn(enemy_spawn_area, enemy_count, color=COLORS['enemy'], is_enemy=True)
 
     return tanks
 
 
-def spawn_powerup(walls, tanks):
-    """道具生成：确保周围60x60空间"""
-    while True:
-        x = random.randint(50, SCREEN_WIDTH - 50)
-        y = random.randint(50, SCREEN_HEIGHT - 50)
+def spawn_powerup(walls, tanks, rng=random):
+    """道具生成：确保周围60x60空间没有墙壁、不与坦克重叠，没有合适位置时返回None。
+    候选格子的3x3邻域都没有墙，格子内任意一点为中心的60x60区域都落在该邻域内"""
+    occupancy = walls.occupancy
+    blocked = np.zeros_like(occupancy)
+    blocked[0, :] = blocked[-1, :] = blocked[:, 0] = blocked[:, -1] = True
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            blocked[1:-1, 1:-1] |= occupancy[1 + dx:occupancy.shape[0] - 1 + dx,
+                                             1 + dy:occupancy.shape[1] - 1 + dy]
+
+    # 排除离存活坦克不足15像素（道具半径）的格子
+    for tank in tanks:
+        if tank.health > 0:
+            left = max(0, int(tank.x - 15) // GRID_SIZE)
+            top = max(0, int(tank.y - 15) // GRID_SIZE)
+            right = int(tank.x + TANK_SIZE + 15) // GRID_SIZE
+            bottom = int(tank.y + TANK_SIZE + 15) // GRID_SIZE
+            blocked[left:right + 1, top:bottom + 1] = True
+
+    candidates = np.flatnonzero(~blocked)
+    if len(candidates) == 0:
+        return None
+    grid_x, grid_y = np.unravel_index(int(candidates[rng.randrange(len(candidates))]), blocked.shape)
+    x = int(grid_x) * GRID_SIZE + rng.randint(0, GRID_SIZE - 1)
+    y = int(grid_y) * GRID_SIZE + rng.randint(0, GRID_SIZE - 1)
 
-        powerup_rect = pygame.Rect(x - 15, y - 15, 30, 30)
-        overlap = False
+    power_types = ["health", "speed", "invincible", "bullet_upgrade"]
+    weights = [0.3, 0.25, 0.25, 0.2]
+    power_type = rng.choices(power_types, weights=weights)[0]
+    return PowerUp(x, y, power_type)
 
-        for wall in walls:
-            if powerup_rect.colliderect(wall.rect):
-                overlap = True
-                break
 
-        for tank in tanks:
-            if tank.health > 0 and powerup_rect.colliderect(pygame.Rect(tank.x, tank.y, TANK_SIZE, TANK_SIZE)):
-                overlap = True
-                break
+def wait_events(timeout=IDLE_WAIT_MS):
+    """阻塞等待事件（最多timeout毫秒），返回收到的全部事件，超时返回空列表"""
+    event = pygame.event.wait(timeout)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
 
-        if overlap:
-            continue
 
-        required_space = pygame.Rect(x - 30, y - 30, 60, 60)
-        space_clear = True
-        for wall in walls:
-            if required_space.colliderect(wall.rect):
-                space_clear = False
-                break
-
-        if space_clear:
-            power_types = ["health", "speed", "invincible", "bullet_upgrade"]
-            weights = [0.3, 0.25, 0.25, 0.2]
-            power_type = random.choices(power_types, weights=weights)[0]
-            return PowerUp(x, y, power_type)
+def needs_redraw(events):
+    """窗口被遮挡后重新露出时需要重绘"""
+    return any(event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED) for event in events)
 
 
 def draw_pause_menu(surface):
@@ -1060,13 +1830,245 @@ def draw_pause_menu(surface):
     pygame.display.flip()
 
 
+# 一个模拟tick的玩家输入：按键位掩码、鼠标位置、射击动作位
+InputFrame = namedtuple("InputFrame", "keys mouse_pos actions")
+
+
+class KeyMask:
+    """按位保存的按键状态，可以像pygame.key.get_pressed()的结果一样按键码取值"""
+
+    def __init__(self, mask):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & REPLAY_KEY_BITS.get(key, 0))
+
+    @staticmethod
+    def from_pressed(pressed):
+        mask = 0
+        for key, bit in REPLAY_KEY_BITS.items():
+            if pressed[key]:
+                mask |= bit
+        return mask
+
+
+class Replay:
+    """对局回放：游戏模式、随机种子和逐tick输入，相同输入按游程编码后压缩保存"""
+
+    MAGIC = b"TKRP1"
+    RUN_FORMAT = struct.Struct("<HBhhB")  # 重复次数, 按键, 鼠标x, 鼠标y, 动作
+
+    def __init__(self, game_mode, seed, frames=None):
+        self.game_mode = game_mode
+        self.seed = seed
+        self.frames = frames if frames is not None else []
+
+    def record(self, frame):
+        self.frames.append(frame)
+
+    def to_bytes(self):
+        header = json.dumps({"mode": self.game_mode, "seed": self.seed}).encode("utf-8")
+        body = bytearray(struct.pack("<H", len(header)) + header)
+        for frame, group in itertools.groupby(self.frames):
+            count = sum(1 for _ in group)
+            while count > 0:
+                run = min(count, 0xFFFF)
+                body += self.RUN_FORMAT.pack(run, frame.keys, frame.mouse_pos[0], frame.mouse_pos[1],
+                                             frame.actions)
+                count -= run
+        return self.MAGIC + zlib.compress(bytes(body), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data.startswith(cls.MAGIC):
+            raise ValueError("不是有效的回放文件")
+        body = zlib.decompress(data[len(cls.MAGIC):])
+        header_size, = struct.unpack_from("<H", body)
+        header = json.loads(body[2:2 + header_size].decode("utf-8"))
+
+        frames = []
+        for run, keys, mouse_x, mouse_y, actions in cls.RUN_FORMAT.iter_unpack(body[2 + header_size:]):
+            frames.extend([InputFrame(keys, (mouse_x, mouse_y), actions)] * run)
+        return cls(header["mode"], header["seed"], frames)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class PhaseTimer:
+    """计时一个阶段，退出时把耗时累加到本帧的统计中"""
+    __slots__ = ("frame", "name", "start")
+
+    def __init__(self, frame, name):
+        self.frame = frame
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info):
+        self.frame[self.name] = self.frame.get(self.name, 0) + time.perf_counter_ns() - self.start
+        return False
+
+
+# 分析器关闭时所有阶段共用的空上下文
+_NO_PHASE = nullcontext()
+
+
+class FrameProfiler:
+    """逐帧的分阶段耗时（perf_counter_ns）和实体数量统计，保留最近PROFILE_WINDOW帧。
+    关闭时phase()只返回共用的空上下文，几乎没有开销"""
+
+    def __init__(self, export_path=None, window=PROFILE_WINDOW):
+        self.enabled = export_path is not None
+        self.show_overlay = False
+        self.export_path = export_path
+        self.window = window
+        # 阶段名/实体名 -> 最近window帧的数值（阶段为纳秒）
+        self.phases = {}
+        self.counts = {}
+        self.frame = {}
+        self.frame_start = 0
+        self.frames = 0
+        self.last_export = time.perf_counter()
+        self.overlay = None
+
+    def toggle_overlay(self):
+        """切换浮层；没有导出文件时只在显示浮层期间计时"""
+        self.show_overlay = not self.show_overlay
+        self.enabled = self.show_overlay or self.export_path is not None
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NO_PHASE
+        return PhaseTimer(self.frame, name)
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame = {}
+            self.frame_start = time.perf_counter_ns()
+
+    def end_frame(self, counts):
+        """结束一帧：记录总耗时、各阶段耗时（本帧没有执行的阶段记0）和实体数量"""
+        if not self.enabled or not self.frame_start:
+            return
+        self.frame["frame"] = time.perf_counter_ns() - self.frame_start
+        for name in self.frame:
+            if name not in self.phases:
+                self.phases[name] = deque(maxlen=self.window)
+        for name, samples in self.phases.items():
+            samples.append(self.frame.get(name, 0))
+        for name, value in counts.items():
+            self.counts.setdefault(name, deque(maxlen=self.window)).append(value)
+        self.frame_start = 0
+        self.frames += 1
+
+        if self.export_path and time.perf_counter() - self.last_export >= PROFILE_EXPORT_INTERVAL:
+            self.export()
+
+    @staticmethod
+    def percentiles(samples, scale=1.0):
+        values = np.fromiter(samples, dtype=np.float64, count=len(samples)) * scale
+        p50, p95, p99 = np.percentile(values, (50, 95, 99))
+        return {"p50": p50, "p95": p95, "p99": p99, "mean": values.mean(), "max": values.max()}
+
+    def summary(self):
+        """滚动窗口内各阶段耗时（毫秒）和实体数量的p50/p95/p99/平均/最大值"""
+        return {
+            "frames": self.frames,
+            "window": max((len(samples) for samples in self.phases.values()), default=0),
+            "phases_ms": {name: self.percentiles(samples, 1e-6) for name, samples in self.phases.items()},
+            "counts": {name: self.percentiles(samples) for name, samples in self.counts.items()},
+        }
+
+    def export(self, path=None):
+        """写出统计：.json为完整结构，其他扩展名为CSV；先写临时文件再替换，读取方不会看到半个文件"""
+        path = path or self.export_path
+        summary = self.summary()
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8", newline="") as f:
+            if path.endswith(".json"):
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+            else:
+                f.write("kind,name,p50,p95,p99,mean,max\n")
+                for kind, stats in (("phase_ms", summary["phases_ms"]), ("count", summary["counts"])):
+                    for name, values in stats.items():
+                        f.write(f"{kind},{name},{values['p50']:.4f},{values['p95']:.4f},{values['p99']:.4f},"
+                                f"{values['mean']:.4f},{values['max']:.4f}\n")
+        os.replace(temp_path, path)
+        self.last_export = time.perf_counter()
+
+    def draw(self, surface):
+        """在右上角计时器下方绘制统计浮层，每PROFILE_OVERLAY_REFRESH帧重新生成一次"""
+        if not self.phases:
+            return None
+        if self.overlay is None or self.frames % PROFILE_OVERLAY_REFRESH == 0:
+            font = get_chinese_font(14)
+            summary = self.summary()
+            # 每行：阶段名 + 右对齐的p50/p95/p99（毫秒），按p95从高到低排列
+            rows = [("阶段(ms)", "p50", "p95", "p99")]
+            for name, values in sorted(summary["phases_ms"].items(), key=lambda item: -item[1]["p95"]):
+                rows.append((name, f"{values['p50']:.2f}", f"{values['p95']:.2f}", f"{values['p99']:.2f}"))
+            counts = "  ".join(f"{name}:{int(values['p50'])}" for name, values in summary["counts"].items())
+
+            line_height = font.get_linesize()
+            self.overlay = pygame.Surface((380, line_height * (len(rows) + 1) + 10), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 180))
+            color = (220, 220, 220)
+            for i, row in enumerate(rows):
+                y = 5 + i * line_height
+                self.overlay.blit(font.render(row[0], True, color), (5, y))
+                for column, text in enumerate(row[1:]):
+                    rendered = font.render(text, True, color)
+                    self.overlay.blit(rendered, (255 + column * 55 - rendered.get_width(), y))
+            self.overlay.blit(font.render(counts, True, color), (5, 5 + len(rows) * line_height))
+        return surface.blit(self.overlay, self.overlay.get_rect(topright=(surface.get_width() - 10, 50)))
+
+
+class Camera:
+    """跟随玩家的镜头：x/y为屏幕左上角对应的世界坐标，始终限制在世界范围内"""
+
+    def __init__(self, world_width, world_height, view_width=SCREEN_WIDTH, view_height=SCREEN_HEIGHT):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.view_width = view_width
+        self.view_height = view_height
+        self.x = 0
+        self.y = 0
+
+    @property
+    def offset(self):
+        return self.x, self.y
+
+    @property
+    def view(self):
+        """可见区域（世界坐标）"""
+        return pygame.Rect(self.x, self.y, self.view_width, self.view_height)
+
+    def follow(self, center_x, center_y):
+        """把镜头中心移到(center_x, center_y)"""
+        self.x = int(max(0, min(center_x - self.view_width // 2, self.world_width - self.view_width)))
+        self.y = int(max(0, min(center_y - self.view_height // 2, self.world_height - self.view_height)))
+
+    def to_world(self, pos):
+        return pos[0] + self.x, pos[1] + self.y
+
+    def to_screen(self, pos):
+        return pos[0] - self.x, pos[1] - self.y
+
+
 class Menu:
     def __init__(self, screen):
         self.screen = screen
-        self.clock = pygame.time.Clock()
         self.selected_option = 0
         self.main_options = ["开始游戏", "游戏说明", "退出游戏"]
-        self.mode_options = ["人机对战", "双人对战", "双人+电脑", "返回主菜单"]
+        self.mode_options = ["人机对战", "双人对战", "双人+电脑", "坦克围攻", "返回主菜单"]
         self.current_menu = "main"  # "main" 或 "mode"
         self.in_instructions = False
 
@@ -1096,7 +2098,7 @@ class Menu:
             for i, option in enumerate(self.mode_options):
                 button_rect = pygame.Rect(
                     SCREEN_WIDTH // 2 - 100,
-                    SCREEN_HEIGHT // 2 + i * 60 - 20,
+                    SCREEN_HEIGHT // 2 + i * 50 - 10,
                     200, 40
                 )
                 self.buttons.append(button_rect)
@@ -1162,12 +2164,13 @@ class Menu:
         mode_descriptions = [
             "人机对战: 1名玩家 vs 1名电脑",
             "双人对战: 2名玩家对战",
-            "双人+电脑: 2名玩家 vs 1名电脑"
+            "双人+电脑: 2名玩家 vs 1名电脑",
+            "坦克围攻: 2名玩家 vs 24名电脑（大地图）"
         ]
 
         for i, desc in enumerate(mode_descriptions):
             desc_text = info_font.render(desc, True, COLORS['menu_text'])
-            desc_rect = desc_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3 + i * 25))
+            desc_rect = desc_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3 - 15 + i * 25))
             self.screen.blit(desc_text, desc_rect)
 
         # 模式选项（带按钮效果）
@@ -1266,29 +2269,46 @@ class Menu:
 
 
     def run(self):
-        """运行菜单系统"""
+        """运行菜单系统：阻塞等待事件，只在界面变化时重绘"""
         running = True
         selected_mode = None
+        dirty = True
+        # 说明页返回按钮在上次绘制时的悬停状态
+        back_hovered = False
 
         while running:
-            mouse_pos = pygame.mouse.get_pos()
-
-            # 检查鼠标悬停
-            self.check_button_hover(mouse_pos)
+            if dirty:
+                self.check_button_hover(pygame.mouse.get_pos())
+                if self.in_instructions:
+                    back_hovered = bool(self.buttons[0].collidepoint(pygame.mouse.get_pos()))
+                    self.draw_instructions()
+                elif self.current_menu == "main":
+                    self.draw_main_menu()
+                else:
+                    self.draw_mode_menu()
+                dirty = False
 
-            if self.in_instructions:
-                self.draw_instructions()
-            elif self.current_menu == "main":
-                self.draw_main_menu()
-            else:
-                self.draw_mode_menu()
+            events = wait_events()
+            if needs_redraw(events):
+                dirty = True
 
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT:
                     return "quit"
 
+                elif event.type == pygame.MOUSEMOTION:
+                    previous_option = self.selected_option
+                    self.check_button_hover(event.pos)
+                    # 说明页的返回按钮根据鼠标悬停变色，只在悬停状态改变时重绘
+                    if self.in_instructions:
+                        if bool(self.buttons[0].collidepoint(event.pos)) != back_hovered:
+                            dirty = True
+                    elif self.selected_option != previous_option:
+                        dirty = True
+
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
+                        dirty = True
                         if self.in_instructions:
                             self.in_instructions = False
                             self.current_menu = "main"
@@ -1304,7 +2324,8 @@ class Menu:
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:  # 左键点击
                         for i, button in enumerate(self.buttons):
-                            if button.collidepoint(mouse_pos):
+                            if button.collidepoint(event.pos):
+                                dirty = True
                                 if self.in_instructions:
                                     self.in_instructions = False
                                     self.current_menu = "main"
@@ -1331,38 +2352,88 @@ class Menu:
                                     elif i == 2:  # 双人+电脑
                                         selected_mode = "双人+电脑"
                                         running = False
-                                    elif i == 3:  # 返回主菜单
+                                    elif i == 3:  # 坦克围攻
+                                        selected_mode = "坦克围攻"
+                                        running = False
+                                    elif i == 4:  # 返回主菜单
                                         self.current_menu = "main"
                                         self.selected_option = 0
                                         self.update_buttons()
 
-            self.clock.tick(FPS)
-
         return selected_mode
 
 
 class Game:
-    def __init__(self):
-        self.screen = screen
-        self.clock = clock
+    def __init__(self, headless=False, seed=None, record_path=None, bot_players=False, profile_path=None):
+        self.headless = headless
+        # 分阶段性能统计：F3切换浮层，指定profile_path时定期导出
+        self.profiler = FrameProfiler(profile_path)
+        # 玩家坦克也交给AI控制（用于无界面批量模拟）
+        self.bot_players = bot_players
+        # 设置后每局结束时把回放写入该路径
+        self.record_path = record_path
+        self.replay = None
+        self.pending_actions = 0
+        # 基础种子：设置后第n局使用 seed + n，未设置时每局随机取种子
+        self.base_seed = seed
+        self.match_count = 0
+        self.seed = None
+        if headless:
+            # 无界面模式：不创建窗口、时钟和菜单
+            self.screen = None
+            self.clock = None
+            self.menu = None
+            self.render_queue = None
+        else:
+            # 只初始化需要的显示子系统（字体按需初始化，不使用音频）
+            pygame.display.init()
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("坦克大战 - 多模式对战版")
+            self.clock = pygame.time.Clock()
+            self.menu = Menu(self.screen)
+            get_sprite_atlas()
+            self.render_queue = RenderQueue()
         self.is_paused = False
         self.game_running = True
-        self.menu = Menu(self.screen)
         self.game_mode = None
         self.game_state = "menu"
         self.time_remaining = GAME_TIME_LIMIT
+        self.tick_count = 0
+        self.winner = None
 
         # 鼠标控制相关
         self.mouse_control = True
         self.show_mouse_aim = True
         self.mouse_pos = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
 
-    def reset_game(self, game_mode):
+    def reset_game(self, game_mode, seed=None):
         """重置游戏状态"""
+        if seed is None:
+            if self.base_seed is not None:
+                seed = self.base_seed + self.match_count
+            else:
+                seed = random.randrange(2 ** 32)
+        self.match_count += 1
+
+        # 每局独立的随机数生成器：rng影响对局结果，fx_rng只用于视觉效果
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.fx_rng = random.Random(self.rng.getrandbits(64))
+
         self.game_mode = game_mode
-        self.walls = create_random_map()
-        self.tanks = create_tanks_safely(self.walls, game_mode)
+        self.replay = Replay(game_mode, seed)
+        self.pending_actions = 0
+        self.walls = create_random_map(self.rng, *world_size(game_mode))
+        self.navigator = Navigator(self.walls)
+        self.camera = Camera(self.walls.width, self.walls.height)
+        self.tanks = create_tanks_safely(self.walls, game_mode, self.rng)
+        self.bullets = BulletManager(rng=self.fx_rng)
+        for tank_id, tank in enumerate(self.tanks):
+            tank.tank_id = tank_id
+            tank.bullet_manager = self.bullets
         self.time_remaining = GAME_TIME_LIMIT
+        self.tick_count = 0
+        self.winner = None
 
         # 分离玩家和敌人
         self.players = [tank for tank in self.tanks if not tank.is_enemy]
@@ -1384,31 +2455,47 @@ class Game:
             self.players[1].mouse_control = False
             self.players[1].keyboard_control = True
 
+        if self.bot_players:
+            for player in self.players:
+                player.enable_ai()
+
+        # 各类炮弹造成的总伤害（含闪电范围伤害）
+        self.damage_by_weapon = dict.fromkeys(BULLET_KINDS, 0)
+
         self.explosions = []
+        self.particles = ParticleSystem(rng=self.fx_rng)
         self.powerups = []
         self.powerup_timer = 0
+        # 按块预渲染的背景（底色+网格+墙壁）：块坐标 -> (块版本号, Surface)
+        self.chunk_surfaces = {}
+        # 脏矩形绘制：上一帧的(镜头偏移, 墙壁版本)及各元素的屏幕绘制范围
+        self.dirty_state = None
+        self.drawn_rects = []
         self.damage_texts = []
         self.heal_texts = []
 
-        self.font = get_chinese_font(28)
-        self.small_font = get_chinese_font(16)
-
-    def handle_events(self):
-        """处理游戏事件"""
+    def handle_events(self, events=None):
+        """处理游戏事件，events为None时从事件队列读取"""
         # 更新鼠标位置
         self.mouse_pos = pygame.mouse.get_pos()
+        if events is None:
+            events = pygame.event.get()
 
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 return False
 
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_p and self.game_state == "playing":
                     self.is_paused = not self.is_paused
+                    # 暂停菜单叠加在画面上，恢复后须整屏重绘才能把它盖掉
+                    self.dirty_state = None
                     if self.is_paused:
                         draw_pause_menu(self.screen)
                 elif event.key == pygame.K_r and self.game_state == "playing":
                     return "restart"
+                elif event.key == pygame.K_F3:
+                    self.profiler.toggle_overlay()
                 elif event.key == pygame.K_ESCAPE:
                     if self.game_state == "playing":
                         self.game_state = "menu"
@@ -1416,31 +2503,56 @@ class Game:
                     else:
                         return False
                 elif event.key == pygame.K_SPACE and self.game_state == "playing" and not self.is_paused:
-                    # 玩家1射击
-                    if len(self.players) > 0 and self.players[0].health > 0:
-                        self.players[0].shoot()
+                    # 玩家1射击（在下一个模拟tick执行）
+                    self.pending_actions |= ACTION_P1_SHOOT
                 elif event.key == pygame.K_RCTRL and self.game_state == "playing" and not self.is_paused:
                     # 玩家2射击
-                    if len(self.players) > 1 and self.players[1].health > 0:
-                        self.players[1].shoot()
+                    self.pending_actions |= ACTION_P2_SHOOT
 
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if self.game_state == "playing" and not self.is_paused:
                     if event.button == 1:  # 左键射击
-                        if (self.mouse_control and len(self.players) > 0 and
-                                self.players[0].health > 0 and self.players[0].mouse_control):
-                            self.players[0].mouse_shoot()
+                        self.pending_actions |= ACTION_P1_MOUSE_SHOOT
                     elif event.button == 3:  # 右键切换瞄准线显示
                         self.show_mouse_aim = not self.show_mouse_aim
                 elif self.game_state == "game_over":
                     # 在结束画面点击开始新游戏
                     return "restart"
 
+            elif needs_redraw([event]):
+                # 窗口内容可能已丢失，下一帧整屏重绘
+                self.dirty_state = None
+
         return True
 
-    def update_player_movement(self):
+    def poll_input(self):
+        """采集当前按键、鼠标和待执行的射击动作，作为下一个tick的输入"""
+        mouse_pos = (0, 0)
+        if len(self.players) > 0 and self.players[0].mouse_control:
+            # 只有鼠标控制时才记录鼠标位置（世界坐标），便于回放压缩
+            mouse_pos = self.camera.to_world(self.mouse_pos)
+        frame = InputFrame(KeyMask.from_pressed(pygame.key.get_pressed()), mouse_pos, self.pending_actions)
+        self.pending_actions = 0
+        return frame
+
+    def apply_input(self, frame):
+        """应用一个tick的输入：先射击再移动"""
+        if frame.actions & ACTION_P1_SHOOT and len(self.players) > 0 and self.players[0].health > 0:
+            self.players[0].shoot()
+        if (frame.actions & ACTION_P1_MOUSE_SHOOT and self.mouse_control and len(self.players) > 0 and
+                self.players[0].health > 0 and self.players[0].mouse_control):
+            self.players[0].mouse_shoot()
+        if frame.actions & ACTION_P2_SHOOT and len(self.players) > 1 and self.players[1].health > 0:
+            self.players[1].shoot()
+
+        self.update_player_movement(KeyMask(frame.keys), frame.mouse_pos)
+
+    def update_player_movement(self, keys=None, mouse_pos=None):
         """更新玩家移动"""
-        keys = pygame.key.get_pressed()
+        if keys is None:
+            keys = pygame.key.get_pressed()
+        if mouse_pos is None:
+            mouse_pos = self.camera.to_world(self.mouse_pos)
 
         # 玩家1移动
         if len(self.players) > 0 and self.players[0].health > 0:
@@ -1448,7 +2560,7 @@ class Game:
 
             if player1.mouse_control:
                 # 鼠标控制：用鼠标瞄准，键盘移动
-                player1.update_mouse_rotation(self.mouse_pos)
+                player1.update_mouse_rotation(mouse_pos)
 
                 # 键盘移动
                 if keys[pygame.K_w]:
@@ -1491,16 +2603,38 @@ class Game:
                 player2.move(1, 0, self.walls, self.tanks)
 
     def update_enemy_ai(self):
-        """更新敌人AI"""
-        for enemy in self.enemies:
-            if enemy.health > 0:
-                enemy.update_ai(self.players, self.walls, self.tanks)
+        """更新AI：决策按坦克序号错开，每tick最多AI_THINK_BUDGET辆坦克做决策，转向移动每tick都做"""
+        ai_tanks = [tank for tank in self.tanks if tank.ai_controlled]
+        interval = max(1, -(-len(ai_tanks) // AI_THINK_BUDGET))
+
+        # 每tick按位置把存活坦克分桶，移动时只和相邻桶里的坦克做碰撞检查
+        buckets = {}
+        for tank in self.tanks:
+            if tank.health > 0:
+                buckets.setdefault((int(tank.x) // TANK_BUCKET_SIZE, int(tank.y) // TANK_BUCKET_SIZE), []).append(tank)
+
+        for tank in ai_tanks:
+            if tank.health <= 0:
+                continue
+            if (tank.tank_id + self.tick_count) % interval == 0:
+                if tank.is_enemy:
+                    tank.think(self.players, self.navigator)
+                else:
+                    # AI控制的玩家坦克以其他所有坦克为目标
+                    tank.think([target for target in self.tanks if target is not tank], self.navigator)
+            bucket_x = int(tank.x) // TANK_BUCKET_SIZE
+            bucket_y = int(tank.y) // TANK_BUCKET_SIZE
+            nearby = [other for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                      for other in buckets.get((bucket_x + dx, bucket_y + dy), ())]
+            tank.steer(self.walls, nearby)
 
     def update_powerups(self):
         """更新道具"""
         self.powerup_timer += 1
         if self.powerup_timer >= 300 and len(self.powerups) < 3:
-            self.powerups.append(spawn_powerup(self.walls, self.tanks))
+            powerup = spawn_powerup(self.walls, self.tanks, self.rng)
+            if powerup is not None:
+                self.powerups.append(powerup)
             self.powerup_timer = 0
 
     def handle_powerup_collisions(self):
@@ -1522,76 +2656,114 @@ class Game:
                     break
 
     def handle_bullet_collisions(self):
-        """处理子弹碰撞"""
-        for tank in self.tanks[:]:
-            for bullet in tank.bullets[:]:
-                bullet.update()
-                if bullet.is_out_of_bounds():
-                    tank.bullets.remove(bullet)
-                    continue
-
-                bullet_rect = pygame.Rect(bullet.x - bullet.radius, bullet.y - bullet.radius,
-                                          bullet.radius * 2, bullet.radius * 2)
-
-                # 墙壁碰撞
-                wall_hit = False
-                for wall in self.walls[:]:
-                    if bullet_rect.colliderect(wall.rect):
-                        tank.bullets.remove(bullet)
-                        self.explosions.append(Explosion(bullet.x, bullet.y))
-                        if wall.breakable:
-                            self.walls.remove(wall)
-                        wall_hit = True
-                        break
-                if wall_hit:
-                    continue
+        """处理子弹碰撞：沿子弹本帧的移动路径做扫掠检测，取路径上最早的命中"""
+        bullets = self.bullets
+        bullets.update()
+        if bullets.count == 0:
+            return
 
-                # 坦克碰撞
-                self.handle_tank_bullet_collision(tank, bullet, bullet_rect)
+        # 向量化筛出本帧可能命中的子弹，再逐个精确结算
+        boxes = bullets.swept_boxes()
+        hit_mask = bullets.wall_candidates(self.walls, boxes)
+        for tank in self.tanks:
+            if tank.health > 0:
+                hit_mask |= bullets.tank_candidates(tank, boxes)
 
-    def handle_tank_bullet_collision(self, tank, bullet, bullet_rect):
-        """处理坦克与子弹碰撞"""
-        for target_tank in self.tanks:
-            if target_tank.health <= 0:
+        # 倒序处理，交换删除不会影响尚未处理的子弹
+        for index in np.flatnonzero(hit_mask)[::-1].tolist():
+            bullet = bullets.record(index)
+            hit = self.sweep_bullet(bullet)
+            if hit is None:
                 continue
 
-            # 不能打自己，同队不能互相伤害
-            if target_tank == tank:
+            t, wall, target_tank = hit
+            bullets.remove(index)
+            bullet = bullet._replace(x=bullet.prev_x + (bullet.x - bullet.prev_x) * t,
+                                     y=bullet.prev_y + (bullet.y - bullet.prev_y) * t)
+
+            # 墙壁碰撞
+            if wall:
+                self.explosions.append(Explosion(bullet.x, bullet.y))
+                if wall.breakable:
+                    self.walls.remove(wall)
                 continue
-            if bullet.is_enemy == target_tank.is_enemy and not target_tank.is_enemy:
-                # 玩家之间可以互相伤害
-                pass
-            elif bullet.is_enemy == target_tank.is_enemy:
-                # 敌人之间不能互相伤害
+
+            # 坦克碰撞
+            self.handle_tank_bullet_collision(self.tanks[bullet.owner], bullet, target_tank)
+
+        bullets.cull_out_of_bounds(self.walls.width, self.walls.height)
+
+    def can_bullet_hit(self, tank, bullet, target_tank):
+        """判断tank发射的子弹能否伤害target_tank"""
+        if target_tank.health <= 0:
+            return False
+
+        # 不能打自己，同队不能互相伤害
+        if target_tank == tank:
+            return False
+        if bullet.is_enemy == target_tank.is_enemy and not target_tank.is_enemy:
+            # 玩家之间可以互相伤害
+            return True
+        elif bullet.is_enemy == target_tank.is_enemy:
+            # 敌人之间不能互相伤害
+            return False
+        return True
+
+    def sweep_bullet(self, bullet):
+        """子弹按点处理、障碍物按子弹半径外扩，返回路径上最早命中的(t, 墙壁, 坦克)，未命中返回None"""
+        dx = bullet.x - bullet.prev_x
+        dy = bullet.y - bullet.prev_y
+        radius = bullet.radius
+        swept_rect = pygame.Rect(min(bullet.x, bullet.prev_x) - radius, min(bullet.y, bullet.prev_y) - radius,
+                                 abs(dx) + radius * 2 + 1, abs(dy) + radius * 2 + 1)
+        best = None
+
+        for wall in self.walls.query(swept_rect):
+            t = segment_rect_entry(bullet.prev_x, bullet.prev_y, dx, dy,
+                                   wall.rect.left - radius, wall.rect.top - radius,
+                                   wall.rect.right + radius, wall.rect.bottom + radius)
+            if t is not None and (best is None or t < best[0]):
+                best = (t, wall, None)
+
+        tank = self.tanks[bullet.owner]
+        for target_tank in self.tanks:
+            if not self.can_bullet_hit(tank, bullet, target_tank):
                 continue
+            left = int(target_tank.x)
+            top = int(target_tank.y)
+            t = segment_rect_entry(bullet.prev_x, bullet.prev_y, dx, dy,
+                                   left - radius, top - radius,
+                                   left + TANK_SIZE + radius, top + TANK_SIZE + radius)
+            if t is not None and (best is None or t < best[0]):
+                best = (t, None, target_tank)
 
-            target_rect = pygame.Rect(target_tank.x, target_tank.y, TANK_SIZE, TANK_SIZE)
-            if bullet_rect.colliderect(target_rect):
-                self.damage_texts.append(DamageText(
-                    target_tank.x + target_tank.width // 2,
-                    target_tank.y,
-                    bullet.damage,
-                    bullet.damage_type
-                ))
-
-                # 闪电AOE伤害
-                if hasattr(bullet, 'aoe_radius'):
-                    self.handle_lightning_aoe(tank, bullet, target_tank)
-
-                if target_tank.invincible <= 0:
-                    target_tank.health -= bullet.damage
-
-                tank.bullets.remove(bullet)
-                self.explosions.append(Explosion(bullet.x, bullet.y, 25))
-
-                if target_tank.health <= 0:
-                    # 坦克死亡，从列表中移除
-                    self.explosions.append(Explosion(
-                        target_tank.x + target_tank.width // 2,
-                        target_tank.y + target_tank.height // 2, 40
-                    ))
-                return True
-        return False
+        return best
+
+    def handle_tank_bullet_collision(self, tank, bullet, target_tank):
+        """处理坦克与子弹碰撞"""
+        self.damage_texts.append(DamageText(
+            target_tank.x + target_tank.width // 2,
+            target_tank.y,
+            bullet.damage,
+            bullet.damage_type
+        ))
+
+        # 闪电AOE伤害
+        if bullet.aoe_radius > 0:
+            self.handle_lightning_aoe(tank, bullet, target_tank)
+
+        if target_tank.invincible <= 0:
+            target_tank.health -= bullet.damage
+            self.damage_by_weapon[bullet.damage_type] += bullet.damage
+
+        self.explosions.append(Explosion(bullet.x, bullet.y, 25))
+
+        if target_tank.health <= 0:
+            # 坦克死亡
+            self.explosions.append(Explosion(
+                target_tank.x + target_tank.width // 2,
+                target_tank.y + target_tank.height // 2, 40
+            ))
 
     def handle_lightning_aoe(self, tank, bullet, original_target):
         """处理闪电AOE伤害"""
@@ -1605,6 +2777,7 @@ class Game:
                 if distance < bullet.aoe_radius and aoe_tank.invincible <= 0:
                     aoe_damage = bullet.damage // 2
                     aoe_tank.health -= aoe_damage
+                    self.damage_by_weapon[bullet.damage_type] += aoe_damage
                     self.damage_texts.append(DamageText(
                         aoe_tank.x + aoe_tank.width // 2,
                         aoe_tank.y - 20,
@@ -1614,102 +2787,201 @@ class Game:
                     self.explosions.append(Explosion(aoe_tank.x + aoe_tank.width // 2,
                                                      aoe_tank.y + aoe_tank.height // 2, 10))
 
-    def draw_game(self):
-        """绘制游戏画面"""
-        self.screen.fill(COLORS['background'])
-
-        # 绘制网格
-        self.draw_grid()
-
-        # 绘制游戏元素
-        for wall in self.walls:
-            wall.draw(self.screen)
-        for powerup in self.powerups:
-            powerup.draw(self.screen)
-        for tank in self.tanks:
-            if tank.health > 0:
-                tank.draw(self.screen)
-            for bullet in tank.bullets:
-                bullet.draw(self.screen)
-        for explosion in self.explosions:
-            explosion.draw(self.screen)
-        for damage_text in self.damage_texts:
-            damage_text.draw(self.screen)
-        for heal_text in self.heal_texts:
-            heal_text.draw(self.screen)
+    def draw_game(self, alpha=1.0, dirty=False):
+        """绘制游戏画面，alpha为两次模拟tick之间的插值比例。只绘制镜头可见区域内的内容。
+        dirty为True且镜头和墙壁都没变时，只恢复上一帧各元素下面的背景再重绘，返回需要更新到显示器的矩形；
+        返回None表示应整屏更新（display.flip）"""
+        profiler = self.profiler
+        self.update_camera(alpha)
+        view = self.camera.view
+        offset = view.topleft
+        state = (offset, self.walls.version)
+        partial = dirty and self.dirty_state == state
+        # 本帧各元素的绘制范围（屏幕坐标）
+        rects = [] if dirty else None
+
+        # 背景层（底色+网格+墙壁）按块预渲染，只贴可见的块
+        with profiler.phase("draw_background"):
+            if partial:
+                for rect in self.drawn_rects:
+                    self.restore_background(rect, view)
+            else:
+                if self.walls.width < view.width or self.walls.height < view.height:
+                    self.screen.fill(COLORS['background'])
+                chunk_pixels = CHUNK_CELLS * GRID_SIZE
+                for chunk in self.walls.chunks_in_rect(view):
+                    self.screen.blit(self.get_chunk_surface(chunk),
+                                     (chunk[0] * chunk_pixels - view.left, chunk[1] * chunk_pixels - view.top))
+
+        # 各元素把(精灵, 屏幕位置)加入对应图层，最后每层一次批量提交；留出血条、推进器火焰和文字的余量
+        visible = view.inflate(GRID_SIZE * 4, GRID_SIZE * 4)
+        layers = self.render_queue.layers
+        with profiler.phase("draw_powerups"):
+            items = layers["powerups"]
+            for powerup in self.powerups:
+                if visible.collidepoint(powerup.x, powerup.y):
+                    with screen_position(powerup, offset):
+                        items.extend(powerup.sprites())
+        with profiler.phase("draw_particles"):
+            layers["particles"].extend(self.particles.sprites(view))
+        with profiler.phase("draw_tanks"):
+            items = layers["tanks"]
+            for tank in self.tanks:
+                if tank.health > 0 and visible.collidepoint(tank.x, tank.y):
+                    with interpolated_position(tank, alpha, offset):
+                        items.extend(tank.sprites())
+        with profiler.phase("draw_bullets"):
+            layers["bullets"].extend(self.bullets.sprites(alpha, view))
+        with profiler.phase("draw_effects"):
+            items = layers["effects"]
+            for effect in itertools.chain(self.explosions, self.damage_texts, self.heal_texts):
+                if visible.collidepoint(effect.x, effect.y):
+                    with screen_position(effect, offset):
+                        items.extend(effect.sprites())
+        with profiler.phase("draw_submit"):
+            self.render_queue.flush(self.screen, rects)
 
         # 绘制鼠标瞄准线
         if (self.mouse_control and self.show_mouse_aim and self.game_state == "playing" and
                 len(self.players) > 0 and self.players[0].health > 0 and self.players[0].mouse_control):
-            self.players[0].draw_aim_line(self.screen, self.mouse_pos)
-
-        # 绘制UI
-        self.draw_ui()
-
-    def draw_grid(self):
-        """绘制背景网格"""
-        for x in range(0, SCREEN_WIDTH, GRID_SIZE):
-            pygame.draw.line(self.screen, (40, 40, 50), (x, 0), (x, SCREEN_HEIGHT), 1)
-        for y in range(0, SCREEN_HEIGHT, GRID_SIZE):
-            pygame.draw.line(self.screen, (40, 40, 50), (0, y), (SCREEN_WIDTH, y), 1)
+            with screen_position(self.players[0], offset):
+                self.players[0].draw_aim_line(self.screen, self.mouse_pos)
+                if dirty:
+                    rects.append(self.players[0].aim_line_bounds(self.mouse_pos))
+
+        # 绘制UI和性能浮层
+        with profiler.phase("draw_ui"):
+            ui_rects = self.draw_ui()
+            if profiler.show_overlay:
+                ui_rects.append(profiler.draw(self.screen))
+
+        if not dirty:
+            # 之后可能还会叠加暂停菜单等内容，下一次脏矩形绘制须整屏重绘
+            self.dirty_state = None
+            return None
+
+        rects.extend(rect for rect in ui_rects if rect is not None)
+        screen_rect = self.screen.get_rect()
+        previous = self.drawn_rects
+        self.drawn_rects = [clipped for clipped in (rect.clip(screen_rect) for rect in rects) if clipped]
+        self.dirty_state = state
+        if not partial:
+            return None
+        return merge_dirty_rects(previous + self.drawn_rects, screen_rect.width * screen_rect.height * DIRTY_AREA_LIMIT)
+
+    def restore_background(self, rect, view):
+        """把屏幕上的rect区域恢复成背景：从对应块的预渲染背景中截取"""
+        world_rect = rect.move(view.topleft)
+        if world_rect.right > self.walls.width or world_rect.bottom > self.walls.height:
+            self.screen.fill(COLORS['background'], rect)
+        chunk_pixels = CHUNK_CELLS * GRID_SIZE
+        for chunk in self.walls.chunks_in_rect(world_rect):
+            chunk_rect = pygame.Rect(chunk[0] * chunk_pixels, chunk[1] * chunk_pixels, chunk_pixels, chunk_pixels)
+            part = world_rect.clip(chunk_rect)
+            self.screen.blit(self.get_chunk_surface(chunk), (part.x - view.left, part.y - view.top),
+                             part.move(-chunk_rect.x, -chunk_rect.y))
+
+    def update_camera(self, alpha=1.0):
+        """镜头跟随存活玩家（插值后位置）：能同屏时取中点，否则跟随排在前面的玩家"""
+        positions = [(player.prev_x + (player.x - player.prev_x) * alpha,
+                      player.prev_y + (player.y - player.prev_y) * alpha)
+                     for player in self.players if player.health > 0]
+        if not positions:
+            return
+        xs = [x for x, _ in positions]
+        ys = [y for _, y in positions]
+        if (max(xs) - min(xs) + TANK_SIZE + GRID_SIZE * 2 > self.camera.view_width or
+                max(ys) - min(ys) + TANK_SIZE + GRID_SIZE * 2 > self.camera.view_height):
+            xs = xs[:1]
+            ys = ys[:1]
+        self.camera.follow((min(xs) + max(xs) + TANK_SIZE) / 2, (min(ys) + max(ys) + TANK_SIZE) / 2)
+
+    def get_chunk_surface(self, chunk):
+        """取块的预渲染背景，块内墙壁变化（可破坏墙被摧毁）后重新绘制"""
+        version = self.walls.chunk_versions.get(chunk, 0)
+        cached = self.chunk_surfaces.get(chunk)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        chunk_pixels = CHUNK_CELLS * GRID_SIZE
+        left = chunk[0] * chunk_pixels
+        top = chunk[1] * chunk_pixels
+        surface = pygame.Surface((min(chunk_pixels, self.walls.width - left),
+                                  min(chunk_pixels, self.walls.height - top))).convert()
+        surface.fill(COLORS['background'])
+        self.draw_grid(surface)
+        for wall in self.walls.walls_in_chunk(chunk):
+            wall.draw(surface, (left, top))
+        self.chunk_surfaces[chunk] = (version, surface)
+        return surface
+
+    def draw_grid(self, surface):
+        """绘制背景网格（surface的左上角须与网格线对齐）"""
+        width, height = surface.get_size()
+        for x in range(0, width, GRID_SIZE):
+            pygame.draw.line(surface, (40, 40, 50), (x, 0), (x, height), 1)
+        for y in range(0, height, GRID_SIZE):
+            pygame.draw.line(surface, (40, 40, 50), (0, y), (width, y), 1)
 
     def draw_ui(self):
-        """绘制用户界面"""
+        """绘制用户界面，返回各元素的绘制范围"""
+        rects = []
         # 游戏模式
-        mode_text = self.font.render(f'模式: {self.game_mode}', True, COLORS['text'])
-        self.screen.blit(mode_text, (10, 10))
+        mode_text = render_text(f'模式: {self.game_mode}', 28, COLORS['text'])
+        rects.append(self.screen.blit(mode_text, (10, 10)))
 
         # 玩家1生命值
         if len(self.players) > 0:
             health_color = (0, 255, 0) if self.players[0].health > 0 else (150, 150, 150)
-            health_text = self.font.render(f'玩家1: {self.players[0].health}', True, health_color)
-            self.screen.blit(health_text, (10, 45))
+            health_text = render_text(f'玩家1: {self.players[0].health}', 28, health_color)
+            rects.append(self.screen.blit(health_text, (10, 45)))
 
         # 玩家2生命值
         if len(self.players) > 1:
             health_color = (255, 165, 0) if self.players[1].health > 0 else (150, 150, 150)
-            health_text = self.font.render(f'玩家2: {self.players[1].health}', True, health_color)
-            self.screen.blit(health_text, (10, 80))
+            health_text = render_text(f'玩家2: {self.players[1].health}', 28, health_color)
+            rects.append(self.screen.blit(health_text, (10, 80)))
 
         # 时间显示（移到右上角）
         minutes = self.time_remaining // (60 * FPS)
         seconds = (self.time_remaining % (60 * FPS)) // FPS
-        time_text = self.font.render(f'时间: {minutes:02d}:{seconds:02d}', True, COLORS['text'])
-        self.screen.blit(time_text, (SCREEN_WIDTH - 180, 10))
+        time_text = render_text(f'时间: {minutes:02d}:{seconds:02d}', 28, COLORS['text'])
+        rects.append(self.screen.blit(time_text, (SCREEN_WIDTH - 180, 10)))
 
         # 状态效果
         effect_y = 110
         if len(self.players) > 0 and self.players[0].health > 0:
             for effect in self.players[0].status_effects:
-                effect.draw(self.screen, 10, effect_y)
+                rects.append(effect.draw(self.screen, 10, effect_y))
                 effect_y += 45
 
         # 控制提示
         if len(self.players) > 0 and self.players[0].health > 0 and self.players[0].mouse_control:
-            controls_text = self.small_font.render(
+            controls_text = render_text(
                 'WASD移动 | 鼠标瞄准 | 左键射击 | 右键切换瞄准 | P暂停 | R重开 | ESC菜单',
-                True, COLORS['text']
+                16, COLORS['text']
             )
         else:
-            controls_text = self.small_font.render(
+            controls_text = render_text(
                 'WASD移动和转向 | 空格射击 | P暂停 | R重开 | ESC菜单',
-                True, COLORS['text']
+                16, COLORS['text']
             )
-        self.screen.blit(controls_text, (SCREEN_WIDTH // 2 - 250, SCREEN_HEIGHT - 30))
+        rects.append(self.screen.blit(controls_text, (SCREEN_WIDTH // 2 - 250, SCREEN_HEIGHT - 30)))
 
         # 玩家2控制提示
         if len(self.players) > 1 and self.players[1].health > 0:
-            player2_controls = self.small_font.render(
+            player2_controls = render_text(
                 '玩家2: 方向键移动 | 右Ctrl射击',
-                True, (255, 165, 0)
+                16, (255, 165, 0)
             )
-            self.screen.blit(player2_controls, (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 60))
+            rects.append(self.screen.blit(player2_controls, (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 60)))
 
         # 鼠标控制提示
         if (self.mouse_control and self.show_mouse_aim and
                 len(self.players) > 0 and self.players[0].health > 0 and self.players[0].mouse_control):
-            aim_hint = self.small_font.render("鼠标瞄准 | 左键射击 | 右键隐藏瞄准线", True, (200, 200, 100))
-            self.screen.blit(aim_hint, (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 90))
+            aim_hint = render_text("鼠标瞄准 | 左键射击 | 右键隐藏瞄准线", 16, (200, 200, 100))
+            rects.append(self.screen.blit(aim_hint, (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 90)))
+        return rects
 
     def check_game_state(self):
         """检查游戏状态"""
@@ -1717,11 +2989,12 @@ class Game:
         if self.game_state == "playing" and not self.is_paused:
             self.time_remaining -= 1
 
-        # 检查存活坦克数量
+        # 检查存活坦克数量：每名玩家各为一方，所有敌人同属一方
         alive_tanks = [tank for tank in self.tanks if tank.health > 0]
+        alive_sides = {"enemy" if tank.is_enemy else tank.tank_id for tank in alive_tanks}
 
-        if len(alive_tanks) == 1:
-            # 只有一个坦克存活，游戏结束
+        if len(alive_sides) == 1:
+            # 只剩一方存活，游戏结束
             self.game_state = "game_over"
             self.winner = alive_tanks[0]
             return True
@@ -1777,18 +3050,22 @@ class Game:
         alive_tanks = [tank for tank in self.tanks if tank.health > 0]
         if self.time_remaining <= 0 and len(alive_tanks) > 0:
             stats_lines = ["时间到! 按血量判定胜负:"]
-            for tank in self.tanks:
+            for tank in self.players:
                 if tank.health > 0:
-                    if tank.is_enemy:
-                        name = "电脑"
-                        color = (220, 100, 100)
-                    elif tank.is_player2:
+                    if tank.is_player2:
                         name = "玩家2"
                         color = (255, 165, 0)
                     else:
                         name = "玩家1"
                         color = (80, 160, 255)
                     stats_lines.append(f"{name}: {tank.health}生命值")
+            # 电脑坦克可能有几十辆，只显示一行汇总
+            alive_enemies = [tank for tank in self.enemies if tank.health > 0]
+            if len(alive_enemies) == 1:
+                stats_lines.append(f"电脑: {alive_enemies[0].health}生命值")
+            elif alive_enemies:
+                best = max(tank.health for tank in alive_enemies)
+                stats_lines.append(f"电脑: 存活{len(alive_enemies)}辆, 最高{best}生命值")
         else:
             stats_lines = [f"游戏模式: {self.game_mode}"]
 
@@ -1804,14 +3081,115 @@ class Game:
 
         pygame.display.flip()
 
+    def step(self, frame=None):
+        """推进一帧游戏逻辑（不处理事件、不绘制），frame为本tick的玩家输入，返回对局是否结束"""
+        # 记录上一tick的位置，供插值绘制使用
+        for tank in self.tanks:
+            tank.prev_x, tank.prev_y = tank.x, tank.y
+
+        profiler = self.profiler
+        if frame is not None:
+            self.replay.record(frame)
+            with profiler.phase("update_player_movement"):
+                self.apply_input(frame)
+        with profiler.phase("update_enemy_ai"):
+            self.update_enemy_ai()
+
+        with profiler.phase("particles_update"):
+            self.particles.update()
+        with profiler.phase("tank_update"):
+            for tank in self.tanks:
+                if tank.health > 0:
+                    tank.update(self.particles)
+
+        with profiler.phase("update_powerups"):
+            self.update_powerups()
+        with profiler.phase("handle_powerup_collisions"):
+            self.handle_powerup_collisions()
+        with profiler.phase("handle_bullet_collisions"):
+            self.handle_bullet_collisions()
+
+        # 更新爆炸效果和文字
+        with profiler.phase("update_effects"):
+            self.heal_texts = [text for text in self.heal_texts if text.update()]
+            self.damage_texts = [text for text in self.damage_texts if text.update()]
+            for explosion in self.explosions[:]:
+                explosion.update()
+                if not explosion.active:
+                    self.explosions.remove(explosion)
+
+        self.tick_count += 1
+        return self.check_game_state()
+
+    def run_headless(self, game_mode, max_ticks=None, seed=None):
+        """无界面运行一局：不绘制、不限帧，返回获胜坦克（平局为None）"""
+        self.reset_game(game_mode, seed)
+        self.game_state = "playing"
+
+        # 分析器开启时每个tick算作一帧
+        profiler = self.profiler
+        while True:
+            profiler.begin_frame()
+            game_over = self.step()
+            if profiler.enabled:
+                profiler.end_frame(self.entity_counts())
+            if game_over or (max_ticks is not None and self.tick_count >= max_ticks):
+                break
+
+        return self.winner
+
+    def entity_counts(self):
+        """当前各类实体数量，供性能统计使用"""
+        return {
+            "tanks": sum(tank.health > 0 for tank in self.tanks),
+            "bullets": self.bullets.count,
+            "particles": self.particles.count,
+            "explosions": len(self.explosions),
+            "texts": len(self.damage_texts) + len(self.heal_texts),
+            "powerups": len(self.powerups),
+        }
+
+    def play_replay(self, replay, render=False):
+        """按回放重新模拟对局：不限帧，render为True时逐tick绘制，返回获胜坦克"""
+        self.reset_game(replay.game_mode, replay.seed)
+        self.game_state = "playing"
+
+        for frame in replay.frames:
+            game_over = self.step(frame)
+            if render:
+                if frame.mouse_pos != (0, 0):
+                    self.mouse_pos = self.camera.to_screen(frame.mouse_pos)
+                self.draw_game()
+                pygame.display.flip()
+                pygame.event.pump()
+            if game_over:
+                break
+
+        return self.winner
+
     def run_game_loop(self, game_mode):
         """运行游戏主循环"""
         self.reset_game(game_mode)
         self.game_state = "playing"
 
+        # 固定步长循环：模拟按SIM_DT推进，渲染按实际帧率进行并插值
+        accumulator = 0.0
+        previous_time = time.perf_counter()
+
+        profiler = self.profiler
         while True:
-            # 处理事件
-            event_result = self.handle_events()
+            # 处理事件，暂停时阻塞等待而不是空转
+            was_paused = self.is_paused
+            events = None
+            if was_paused:
+                events = wait_events()
+                if needs_redraw(events):
+                    self.draw_game()
+                    draw_pause_menu(self.screen)
+                    self.dirty_state = None
+            profiler.begin_frame()
+            with profiler.phase("handle_events"):
+                event_result = self.handle_events(events)
             if event_result == "restart":
                 return "restart"
             elif event_result == "menu":
@@ -1819,53 +3197,59 @@ class Game:
             elif not event_result:
                 return False
 
-            if self.is_paused:
+            now = time.perf_counter()
+            frame_time = min(now - previous_time, MAX_FRAME_TIME)
+            previous_time = now
+
+            # 暂停期间（包括刚恢复的这一帧）的等待时间不计入模拟
+            if was_paused or self.is_paused:
                 continue
 
             if self.game_state != "playing":
                 continue
 
-            # 更新游戏状态
-            self.update_player_movement()
-            if len(self.enemies) > 0:
-                self.update_enemy_ai()
-
-            for tank in self.tanks:
-                if tank.health > 0:
-                    tank.update()
-
-            self.update_powerups()
-            self.heal_texts = [text for text in self.heal_texts if text.update()]
-            self.damage_texts = [text for text in self.damage_texts if text.update()]
-
-            self.handle_powerup_collisions()
-            self.handle_bullet_collisions()
-
-            # 更新爆炸效果
-            for explosion in self.explosions[:]:
-                explosion.update()
-                if not explosion.active:
-                    self.explosions.remove(explosion)
+            # 更新游戏状态，机器落后时一帧内追赶多步并跳过中间的绘制
+            accumulator += frame_time
+            game_over = False
+            steps = 0
+            while accumulator >= SIM_DT and not game_over:
+                game_over = self.step(self.poll_input())
+                accumulator -= SIM_DT
+                steps += 1
+                if steps >= MAX_STEPS_PER_FRAME:
+                    accumulator = 0.0
+                    break
 
             # 绘制游戏
-            self.draw_game()
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            # 镜头不动时只把变化的区域更新到显示器
+            with profiler.phase("draw_game"):
+                dirty_rects = self.draw_game(1.0 if game_over else accumulator / SIM_DT, dirty=True)
+            with profiler.phase("display_flip"):
+                if dirty_rects is None:
+                    pygame.display.flip()
+                else:
+                    pygame.display.update(dirty_rects)
+            with profiler.phase("clock_tick"):
+                self.clock.tick(MAX_RENDER_FPS)
+            if profiler.enabled:
+                profiler.end_frame(self.entity_counts())
 
             # 检查游戏状态
-            if self.check_game_state():
+            if game_over:
                 if self.game_state == "game_over":
                     self.show_game_over_screen()
-                    # 等待点击
-                    waiting = True
-                    while waiting:
-                        for event in pygame.event.get():
+                    # 阻塞等待点击
+                    while True:
+                        events = wait_events()
+                        if needs_redraw(events):
+                            self.draw_game()
+                            self.show_game_over_screen()
+                        for event in events:
                             if event.type == pygame.QUIT:
                                 return False
                             elif event.type == pygame.MOUSEBUTTONDOWN:
                                 if event.button == 1:
                                     return "restart"
-                        self.clock.tick(FPS)
 
     def run(self):
         """运行游戏"""
@@ -1874,10 +3258,12 @@ class Game:
                 menu_result = self.menu.run()
                 if menu_result == "quit":
                     self.game_running = False
-                elif menu_result in ["人机对战", "双人对战", "双人+电脑"]:
+                elif menu_result in GAME_MODES:
                     # 开始游戏循环，自动重开
                     while True:
                         game_result = self.run_game_loop(menu_result)
+                        if self.record_path:
+                            self.replay.save(self.record_path)
                         if game_result == "menu":
                             self.game_state = "menu"
                             break
@@ -1892,10 +3278,79 @@ class Game:
             else:
                 self.game_running = False
 
+        if self.profiler.export_path and self.profiler.frames:
+            self.profiler.export()
         pygame.quit()
 
 
-def main():
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="坦克大战 - 多模式对战版")
+    parser.add_argument("--headless", action="store_true",
+                        help="无界面模式：不打开窗口、不绘制、不限帧地模拟对局")
+    parser.add_argument("--mode", choices=list(GAME_MODES), default="人机对战",
+                        help="无界面模式下的游戏模式")
+    parser.add_argument("--matches", type=int, default=1,
+                        help="无界面模式下连续模拟的对局数")
+    parser.add_argument("--max-ticks", type=int, default=None,
+                        help="无界面模式下每局最多模拟的帧数")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="随机种子，第n局使用 seed + n；相同种子可完全复现对局")
+    parser.add_argument("--record", metavar="PATH", default=None,
+                        help="把每局的输入回放保存到该文件（保留最后一局）")
+    parser.add_argument("--replay", metavar="PATH", default=None,
+                        help="不限帧重放回放文件，配合 --headless 时不绘制")
+    parser.add_argument("--profile", metavar="PATH", default=None,
+                        help="记录分阶段帧耗时并导出p50/p95/p99到该文件（.json或CSV），游戏中按F3显示浮层")
+    return parser.parse_args(argv)
+
+
+def describe_winner(winner):
+    """返回获胜方名称"""
+    if winner is None:
+        return "平局"
+    if winner.is_enemy:
+        return "电脑"
+    if winner.is_player2:
+        return "玩家2"
+    return "玩家1"
+
+
+def run_headless_matches(args):
+    """无界面连续模拟多局并打印结果"""
+    game = Game(headless=True, seed=args.seed, profile_path=args.profile)
+    for i in range(args.matches):
+        winner = game.run_headless(args.mode, args.max_ticks)
+        # 达到--max-ticks仍未分出结果的对局不算作平局
+        result = describe_winner(winner) if game.game_state == "game_over" else "未结束"
+        print(f"第{i + 1}局: {result} ({game.tick_count}帧, 种子{game.seed})")
+    if args.profile:
+        game.profiler.export()
+        print(f"性能统计已写入 {args.profile}")
+
+
+def play_replay_file(args):
+    """重放回放文件并打印结果"""
+    replay = Replay.load(args.replay)
+    game = Game(headless=args.headless)
+    start = time.perf_counter()
+    winner = game.play_replay(replay, render=not args.headless)
+    elapsed = time.perf_counter() - start
+    print(f"回放 {args.replay}: {replay.game_mode}, 种子{replay.seed}, "
+          f"{describe_winner(winner)} ({game.tick_count}帧, 用时{elapsed:.2f}秒)")
+    if not args.headless:
+        pygame.quit()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.replay:
+        play_replay_file(args)
+        return
+    if args.headless:
+        run_headless_matches(args)
+        return
+
     print("坦克大战 - 多模式对战版 启动!")
     print("主菜单功能:")
     print("1. 开始游戏 - 选择游戏模式")
@@ -1912,9 +3367,9 @@ def main():
     print("操作说明:")
     print("玩家1: WASD移动和转向 | 空格射击")
     print("玩家2: 方向键移动和转向 | 右Ctrl射击")
-    print("通用: P暂停 | R重开 | ESC菜单")
+    print("通用: P暂停 | R重开 | ESC菜单 | F3性能统计")
 
-    game = Game()
+    game = Game(seed=args.seed, record_path=args.record, profile_path=args.profile)
     game.run()
 
 
@@ -0,0 +1,192 @@
+"""Gym风格的训练环境：在无界面的Game之上提供 reset(seed) / step(actions)
+
+单个环境:
+    env = TankEnv("人机对战")
+    obs = env.reset(seed=0)
+    obs, rewards, done, info = env.step([ACTION_SHOOT + MOVE_UP])
+
+向量化环境（K局同时推进，观测按第0维堆叠）:
+    envs = VecTankEnv(64, "人机对战", seed=0)
+    obs = envs.reset()
+    obs, rewards, dones, infos = envs.step(np.zeros((64, 1), dtype=np.int64))
+"""
+import numpy as np
+
+import game
+import pygame
+
+# 动作编码：移动方向 + 是否射击，即 action = 方向 + ACTION_SHOOT * 射击
+MOVE_NONE = 0
+MOVE_UP = 1
+MOVE_DOWN = 2
+MOVE_LEFT = 3
+MOVE_RIGHT = 4
+ACTION_SHOOT = 5
+NUM_ACTIONS = 10
+
+# 每个玩家的方向键（与Game.update_player_movement一致）及射击动作位
+PLAYER_MOVE_KEYS = (
+    (pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d),
+    (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT),
+)
+PLAYER_SHOOT_ACTIONS = (game.ACTION_P1_SHOOT, game.ACTION_P2_SHOOT)
+
+# 观测中每辆坦克的特征：x, y, 朝向, 生命值, 最大生命值, 是否存活, 是否敌人, 炮弹类型
+TANK_FEATURES = 8
+# 观测中每颗子弹的特征：x, y, vx, vy, 是否敌人发射, 炮弹类型
+BULLET_FEATURES = 6
+
+WIN_REWARD = 1.0
+HEALTH_REWARD_SCALE = 0.01
+
+
+def tank_count(game_mode):
+    config = game.GAME_MODES[game_mode]
+    return config["player_count"] + config["enemy_count"]
+
+
+class TankEnv:
+    """单局环境：前num_agents名玩家由动作控制，其余玩家和敌人由AI控制"""
+
+    def __init__(self, game_mode="人机对战", num_agents=None, max_tanks=None, max_bullets=64, max_ticks=None):
+        player_count = game.GAME_MODES[game_mode]["player_count"]
+        self.game_mode = game_mode
+        self.num_agents = player_count if num_agents is None else num_agents
+        if not 1 <= self.num_agents <= player_count:
+            raise ValueError(f"{game_mode} 最多支持 {player_count} 个智能体")
+        self.max_tanks = tank_count(game_mode) if max_tanks is None else max_tanks
+        self.max_bullets = max_bullets
+        self.max_ticks = max_ticks
+        self.game = game.Game(headless=True)
+        self.health = None
+
+    def reset(self, seed=None):
+        sim = self.game
+        sim.reset_game(self.game_mode, seed)
+        sim.game_state = "playing"
+        if len(sim.tanks) > self.max_tanks:
+            raise ValueError(f"{self.game_mode} 有 {len(sim.tanks)} 辆坦克，超过 max_tanks={self.max_tanks}")
+
+        # 智能体统一使用键盘式控制：移动方向即朝向
+        for player in sim.players[:self.num_agents]:
+            player.mouse_control = False
+            player.keyboard_control = True
+        for player in sim.players[self.num_agents:]:
+            player.enable_ai()
+
+        self.health = self.tank_health()
+        return self.observe()
+
+    @property
+    def seed(self):
+        return self.game.seed
+
+    def tank_health(self):
+        return np.array([max(0, tank.health) for tank in self.game.tanks], dtype=np.float32)
+
+    def actions_to_input(self, actions):
+        keys = 0
+        shoot = 0
+        for player_index, action in enumerate(actions[:self.num_agents]):
+            action = int(action)
+            direction = action % ACTION_SHOOT
+            if direction != MOVE_NONE:
+                keys |= game.REPLAY_KEY_BITS[PLAYER_MOVE_KEYS[player_index][direction - 1]]
+            if action >= ACTION_SHOOT:
+                shoot |= PLAYER_SHOOT_ACTIONS[player_index]
+        return game.InputFrame(keys, (0, 0), shoot)
+
+    def step(self, actions):
+        """推进一个tick，返回(观测, 每个智能体的奖励, 是否结束, 信息)"""
+        sim = self.game
+        done = sim.step(self.actions_to_input(actions))
+        truncated = not done and self.max_ticks is not None and sim.tick_count >= self.max_ticks
+
+        # 奖励：对手损失的生命值减去自己损失的生命值，结束时胜者+1、其余智能体-1
+        health = self.tank_health()
+        lost = (self.health - health) * HEALTH_REWARD_SCALE
+        self.health = health
+        rewards = np.empty(self.num_agents, dtype=np.float32)
+        for agent_index in range(self.num_agents):
+            agent = sim.players[agent_index]
+            rewards[agent_index] = lost.sum() - 2 * lost[agent.tank_id]
+            if done and sim.winner is not None:
+                rewards[agent_index] += WIN_REWARD if sim.winner is agent else -WIN_REWARD
+
+        info = {"tick": sim.tick_count, "seed": sim.seed, "truncated": truncated}
+        if done:
+            info["winner"] = game.describe_winner(sim.winner)
+        return self.observe(), rewards, done or truncated, info
+
+    def observe(self):
+        """返回固定形状的观测：坦克、子弹（不足补零）、墙壁格子（0空地/1固定墙/2可破坏墙）"""
+        sim = self.game
+        tanks = np.zeros((self.max_tanks, TANK_FEATURES), dtype=np.float32)
+        for i, tank in enumerate(sim.tanks):
+            tanks[i] = (tank.x, tank.y, tank.rotation, max(0, tank.health), tank.max_health,
+                        tank.health > 0, tank.is_enemy, game.BULLET_KINDS.index(tank.bullet_type))
+
+        bullets = np.zeros((self.max_bullets, BULLET_FEATURES), dtype=np.float32)
+        manager = sim.bullets
+        count = min(manager.count, self.max_bullets)
+        bullets[:count, 0:2] = manager.pos[:count]
+        bullets[:count, 2:4] = manager.vel[:count]
+        bullets[:count, 4] = manager.is_enemy[:count]
+        bullets[:count, 5] = manager.kind[:count]
+
+        walls = sim.walls.occupancy.astype(np.int8)
+        walls[sim.walls.breakable] = 2
+
+        return {
+            "tanks": tanks,
+            "bullets": bullets,
+            "bullet_count": np.int32(count),
+            "walls": walls,
+            "time_remaining": np.int32(sim.time_remaining),
+        }
+
+
+class VecTankEnv:
+    """同时推进num_envs局的向量化环境，结束的对局自动以新种子重开"""
+
+    def __init__(self, num_envs, game_mode="人机对战", seed=0, **env_kwargs):
+        self.envs = [TankEnv(game_mode, **env_kwargs) for _ in range(num_envs)]
+        self.num_envs = num_envs
+        self.base_seed = seed
+        self.episode_counts = [0] * num_envs
+
+    @property
+    def num_agents(self):
+        return self.envs[0].num_agents
+
+    def next_seed(self, env_index):
+        """第env_index个环境第n局的种子，保证所有环境、所有局互不相同"""
+        seed = self.base_seed + self.episode_counts[env_index] * self.num_envs + env_index
+        self.episode_counts[env_index] += 1
+        return seed
+
+    @staticmethod
+    def stack(observations):
+        return {key: np.stack([obs[key] for obs in observations]) for key in observations[0]}
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.base_seed = seed
+            self.episode_counts = [0] * self.num_envs
+        return self.stack([env.reset(self.next_seed(i)) for i, env in enumerate(self.envs)])
+
+    def step(self, actions):
+        """actions形状为(num_envs, num_agents)，返回批量的(观测, 奖励, 结束标志, 信息列表)"""
+        actions = np.asarray(actions).reshape(self.num_envs, -1)
+        observations = []
+        rewards = np.empty((self.num_envs, self.num_agents), dtype=np.float32)
+        dones = np.empty(self.num_envs, dtype=bool)
+        infos = []
+        for i, env in enumerate(self.envs):
+            obs, rewards[i], dones[i], info = env.step(actions[i])
+            if dones[i]:
+                info["final_observation"] = obs
+                obs = env.reset(self.next_seed(i))
+            observations.append(obs)
+            infos.append(info)
+        return self.stack(observations), rewards, dones, infos